@@ -3,6 +3,8 @@ from datetime import datetime
 from graphs.mira_graph import mira_graph
 from tools.common.formatters import format_messages, dict_to_markdown
 from tools.common.utils import video_to_text, fill_config_with_env
+from tools.common.media import open_media_bundle
+from tools.skin_analysis_tools import prefetch_best_face, discard_best_face
 import gradio as gr
 from langgraph.types import Command
 from utils.loggers import MiraLog
@@ -14,7 +16,12 @@ from frontend.products_tab import render_products_tab
 from frontend.custom_css import custom_css
 from dotenv import load_dotenv
 from config import MIRA_GREETING_PROMPT
-from utils.tts import text_to_speech, init_audio_cache
+from utils.tts import text_to_speech_async, init_audio_cache, SentenceStreamer, SENTENCE_TIMEOUT_S, AUDIO_DEADLINE_S
+from utils.phrase_bank import get_phrase_audio, build_phrase_bank_in_background
+from utils.face_engine import warmup_face_engine
+from utils.asr import warmup_asr
+from utils.video_pool import start_video_pool
+from config import FACE_ENGINE, VIDEO_POOL, ASR, MEDIA_BUNDLE, PHRASE_BANK
 
 load_dotenv()
 
@@ -107,18 +114,44 @@ def extract_config_values(config):
         config.get('youcam_secret_key', '')
     ]
 
+def _active_flow(state):
+    """主流程图中当前进行中的流程（意图类别），没有时返回 None"""
+    try:
+        snapshot = mira_graph.get_state({"configurable": {"thread_id": state['config'].get('thread_id')}})
+        return snapshot.values.get("current_flow")
+    except Exception as e:
+        MiraLog("app", f"读取当前流程失败: {e}", "WARNING")
+        return None
+
 def process_user_input(video, text, chat, markdown, state):
+    # 本轮上传的视频只解码一次，各环节共用；无论正常结束、中断还是前端断开，都在本轮结束时释放
+    bundle = open_media_bundle(video) if video else None
+    try:
+        if bundle:
+            # 上传后立即并行启动语音识别与最佳人脸帧提取，分别在图开始前与视频分析节点汇合
+            bundle.prefetch("asr", video_to_text, video)
+            # 只有肤质检测流程会用到最佳人脸帧，其他流程不占用视频处理进程
+            if MEDIA_BUNDLE["prefetch_best_face"] and _active_flow(state) == "肤质检测":
+                bundle.prefetch("best_face", prefetch_best_face, bundle, cleanup=discard_best_face)
+        yield from _process_user_input(video, text, chat, markdown, state, bundle)
+    finally:
+        if bundle:
+            bundle.close()
+
+def _process_user_input(video, text, chat, markdown, state, bundle=None):
     if text:
         chat.append({"role": "user", "content": text, "type": "final"})
     if video:
         chat.append({"role": "user", "content": gr.Video(video), "type": "final"})
-    yield chat, "", state, None, "", None, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+    yield chat, "", state, None, "", gr.update(), *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
 
     if video:
         progress_message = "正在处理视频输入..."
         chat = combine_msg(chat, {"content": progress_message, "type": "progress"})
-        yield chat, "", state, None, "", None, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
-        text += "\n<视频中说话内容>\n" + video_to_text(video) + "\n</视频中说话内容>"
+        yield chat, "", state, None, "", gr.update(), *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+        asr_future = bundle.pop_prefetched("asr") if bundle else None
+        transcript = asr_future.result() if asr_future else video_to_text(video)
+        text += "\n<视频中说话内容>\n" + transcript + "\n</视频中说话内容>"
     if state.get('resume'):
         inputs = Command(
             resume={
@@ -132,9 +165,22 @@ def process_user_input(video, text, chat, markdown, state):
             "messages": format_messages(video, text),
             "user_profile": state['profile'],
             "products_directory": state['products'],
+            "current_video_path": video,
         }
     
     config_for_graph = fill_config_with_env(state['config'])
+    # 流式回复边生成边分句合成，音频片段按顺序推送到流式音频组件
+    streamer = SentenceStreamer(
+        voice=config_for_graph['audio_model_name'],
+        save_dir="audio_cache",
+        api_key=config_for_graph['chat_api_key']
+    )
+    try:
+        yield from _stream_graph(inputs, config_for_graph, streamer, chat, markdown, state)
+    finally:
+        streamer.cancel()
+
+def _stream_graph(inputs, config_for_graph, streamer, chat, markdown, state):
     for mode, step in mira_graph.stream(inputs, {"configurable": config_for_graph}, stream_mode=["custom", "updates"]):
         if mode == "updates" and not "__interrupt__" in step:
             continue
@@ -142,14 +188,26 @@ def process_user_input(video, text, chat, markdown, state):
             content = step.get("__interrupt__")[0].value.get("content")
             chat = combine_msg(chat, {"content": content, "type": "final"})
             state['resume'] = True
-            yield chat, markdown, state, None, "", None, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+            # 固定提问直接使用短语库中的预合成音频，其余提问走流式合成
+            phrase_audio = get_phrase_audio(content, config_for_graph['audio_model_name'])
+            if phrase_audio or not content:
+                yield chat, markdown, state, None, "", phrase_audio, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+            else:
+                streamer.finish(content)
+                yield chat, markdown, state, None, "", gr.update(), *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+                for audio_chunk in streamer.drain(timeout=SENTENCE_TIMEOUT_S, deadline_s=AUDIO_DEADLINE_S):
+                    yield chat, markdown, state, None, "", audio_chunk, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
             break
         msg_type = step.get("type")
         content = step.get("content")
         MiraLog("app", f"msg_type: {msg_type}")
         if msg_type == "progress":
             chat = combine_msg(chat, {"content": content, "type": "progress"})
-            yield chat, markdown, state, None, "", None, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+            if step.get("streaming"):
+                streamer.feed(content)
+            # 没有新的音频片段时不更新音频组件，避免打断正在播放的片段
+            for audio_chunk in streamer.ready_chunks() or [gr.update()]:
+                yield chat, markdown, state, None, "", audio_chunk, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
 
         elif msg_type == "final":
             markdown = dict_to_markdown(content['markdown']) if content.get('markdown') else markdown
@@ -158,49 +216,72 @@ def process_user_input(video, text, chat, markdown, state):
             response = content.get("response", "")
             chat = combine_msg(chat, {"content": response, "type": "final"}) if response else chat
             
-            # 对 final 消息进行 TTS 处理
-            audio_path = None
-            if response:
-                audio_path = text_to_speech(
-                    response,
-                    voice=config_for_graph['audio_model_name'],
-                    save_dir="audio_cache",
-                    api_key=config_for_graph['chat_api_key']
-                )
-            
-            yield chat, markdown, state, None, "", audio_path, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+            # 固定话术使用短语库音频；否则合成剩余的尾句，并按顺序推送尚未播放的音频片段
+            phrase_audio = get_phrase_audio(response, config_for_graph['audio_model_name'])
+            if response and not phrase_audio:
+                streamer.finish(response)
+            yield chat, markdown, state, None, "", phrase_audio or gr.update(), *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+            for audio_chunk in streamer.drain(timeout=SENTENCE_TIMEOUT_S, deadline_s=AUDIO_DEADLINE_S):
+                yield chat, markdown, state, None, "", audio_chunk, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
 
         else:
-            yield chat, markdown, state, None, "", None, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+            yield chat, markdown, state, None, "", gr.update(), *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
 
 def new_chat(state):
     state['config']['thread_id'] = str(uuid.uuid4())
     state['resume'] = False
     greeting_prompt = generate_greeting_prompt(state)
     state['config']['greeting_prompt'] = greeting_prompt
-    greeting_response = mira_graph.invoke({"messages": format_messages(None, greeting_prompt)}, {"configurable": fill_config_with_env(state['config'])}, stream_mode=["custom"])
+    config_for_graph = fill_config_with_env(state['config'])
+    greeting_response = mira_graph.stream({"messages": format_messages(None, greeting_prompt)}, {"configurable": config_for_graph}, stream_mode=["custom"])
+    # 欢迎语同样边生成边分句合成
+    streamer = SentenceStreamer(
+        voice=config_for_graph['audio_model_name'],
+        save_dir="audio_cache",
+        api_key=config_for_graph['chat_api_key']
+    )
     chat = []
     response = ""
     first_chunk = True  
-    for mode, chunk in greeting_response:
-        if mode == "custom" and chunk['type'] == "progress":
-            if first_chunk:
-                first_chunk = False
-                continue
-            else:
-                response = chunk['content']
-            yield combine_msg(chat, {"content": response, "type": "progress"}), "", state, None, "", None, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
-        elif mode == "custom" and chunk['type'] == "final":
-            response = chunk['content']['response']
-            chat = combine_msg(chat, {"content": response, "type": "final"})
-            # 对欢迎语进行 TTS 处理
-            audio_path = text_to_speech(
-                response,
-                voice=fill_config_with_env(state['config'])['audio_model_name'],
-                save_dir="audio_cache",
-                api_key=fill_config_with_env(state['config'])['chat_api_key']
-            ) if response else None
-            yield chat, "", state, None, "", audio_path, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+    try:
+        for mode, chunk in greeting_response:
+            if mode == "custom" and chunk['type'] == "progress":
+                if first_chunk:
+                    first_chunk = False
+                    continue
+                else:
+                    response = chunk['content']
+                if chunk.get("streaming"):
+                    streamer.feed(response)
+                for audio_chunk in streamer.ready_chunks() or [gr.update()]:
+                    yield combine_msg(chat, {"content": response, "type": "progress"}), "", state, None, "", audio_chunk, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+            elif mode == "custom" and chunk['type'] == "final":
+                response = chunk['content']['response']
+                chat = combine_msg(chat, {"content": response, "type": "final"})
+                # 合成欢迎语剩余的尾句
+                if response:
+                    streamer.finish(response)
+                yield chat, "", state, None, "", gr.update(), *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+                for audio_chunk in streamer.drain(timeout=SENTENCE_TIMEOUT_S, deadline_s=AUDIO_DEADLINE_S):
+                    yield chat, "", state, None, "", audio_chunk, *extract_profile_values(state['profile']), *extract_products_values(state['products']), *extract_config_values(state['config'])
+    finally:
+        streamer.cancel()
+
+def _greeting_audio(text, state):
+    """
+    页面加载时在后台合成欢迎语音并推送到流式音频组件。每次加载重新提交（音频缓存命中时立即返回），
+    某次合成失败或超时不会影响之后的会话；超时后取消仍在排队的合成。
+    """
+    config = fill_config_with_env(state['config'])
+    future = text_to_speech_async(text, voice=config['audio_model_name'], save_dir="audio_cache", api_key=config['chat_api_key'])
+    try:
+        audio_path = future.result(timeout=AUDIO_DEADLINE_S)
+    except Exception as e:
+        MiraLog("app", f"欢迎语音合成失败：{e}", "WARNING")
+        audio_path = None
+    finally:
+        future.cancel()
+    yield audio_path or gr.update()
 
 def build_demo():
     with gr.Blocks(theme=gr.themes.Soft(), css=custom_css) as demo:
@@ -247,9 +328,8 @@ def build_demo():
                     for mode, chunk in greeting_response:
                         if mode == "custom" and chunk['type'] == "final":
                             response = chunk['content']['response']
-                    audio_path = text_to_speech(response, voice=fill_config_with_env(app_state.value['config'])['audio_model_name'], save_dir="audio_cache", api_key=fill_config_with_env(app_state.value['config'])['chat_api_key'])
                     chat_out = gr.Chatbot(label="AI对话", value=[{"role": "assistant", "content": response, "type": "final"}], elem_id="chat-out", type="messages")
-                    audio_out = gr.Audio(label="AI语音", elem_id="audio-out", value=audio_path, autoplay=True)
+                    audio_out = gr.Audio(label="AI语音", elem_id="audio-out", autoplay=True, streaming=True)
                 with gr.Column(scale=1):
                     gr.Markdown("#### 🔍 分析结果")
                     with gr.Accordion("💡 这里会显示更详细的分析结果：", open=False):
@@ -280,6 +360,16 @@ def build_demo():
             outputs=[chat_out, markdown_out, app_state, video_in, text_in, audio_out] + profile_widgets + products_widgets + config_widgets
         )
 
+        # 欢迎语音在页面加载后合成并推送，不阻塞界面构建
+        def load_greeting_audio(state):
+            yield from _greeting_audio(response, state)
+
+        demo.load(
+            load_greeting_audio,
+            inputs=[app_state],
+            outputs=[audio_out]
+        )
+
         clear_btn.click(
             lambda markdown: "",
             inputs=[markdown_out],
@@ -287,8 +377,20 @@ def build_demo():
         )
     return demo
 
-demo = build_demo()
-# 初始化音频缓存
-init_audio_cache()
-demo.queue()
-demo.launch(show_error=True, max_threads=10)
\ No newline at end of file
+if __name__ == "__main__":
+    # 视频处理进程池以 spawn 方式启动子进程，启动逻辑必须放在 main 保护内
+    if VIDEO_POOL["enabled"]:
+        # worker 进程各自预加载人脸模型，主进程无需加载
+        start_video_pool()
+    elif FACE_ENGINE.get("warmup_on_startup"):
+        # 后台预加载人脸模型，避免首个视频请求承担模型加载耗时
+        warmup_face_engine(background=True)
+    if ASR.get("warmup_on_startup"):
+        warmup_asr(background=True)
+    demo = build_demo()
+    # 初始化音频缓存
+    init_audio_cache()
+    if PHRASE_BANK["build_on_startup"]:
+        build_phrase_bank_in_background(fill_config_with_env(default_app_state()['config'])['chat_api_key'])
+    demo.queue()
+    demo.launch(show_error=True, max_threads=10)
@@ -0,0 +1,53 @@
+"""
+语音识别后端基准：对同一段音频分别调用各 ASR 后端，统计识别耗时与实时率（RTF），
+本地后端可对比不同 CPU 线程数，便于为部署机器选择最快的配置。
+
+用法：
+    python -m benchmarks.asr talk.mp4 --backends google faster_whisper --runs 3
+    python -m benchmarks.asr talk.mp4 --backends faster_whisper --cpu-threads 1 2 4 8   # 无需联网
+"""
+import argparse
+import time
+
+from config import MEDIA_BUNDLE
+from tools.common.media import decode_audio_pcm
+from utils.asr import FasterWhisperBackend, get_asr_backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASR 后端耗时与实时率基准")
+    parser.add_argument("video", help="待测视频或音频文件路径")
+    parser.add_argument("--backends", nargs="+", default=["google", "faster_whisper"], help="待测后端名称")
+    parser.add_argument("--runs", type=int, default=3, help="每个配置的调用次数")
+    parser.add_argument("--cpu-threads", type=int, nargs="*", default=[], help="faster_whisper 待测的 CPU 线程数")
+    args = parser.parse_args()
+
+    sample_rate = MEDIA_BUNDLE["audio_sample_rate"]
+    pcm = decode_audio_pcm(args.video, sample_rate)
+    audio_s = len(pcm) / 2 / sample_rate
+    print(f"音频时长: {audio_s:.2f}s")
+
+    configs = []
+    for name in args.backends:
+        if name == FasterWhisperBackend.name and args.cpu_threads:
+            configs += [(f"{name}[threads={n}]", FasterWhisperBackend(cpu_threads=n)) for n in args.cpu_threads]
+        else:
+            configs.append((name, get_asr_backend(name)))
+
+    print(f"{'后端':<28}{'加载(ms)':>10}{'平均耗时(ms)':>14}{'RTF':>8}  文本")
+    for label, backend in configs:
+        t0 = time.perf_counter()
+        backend.warmup()
+        load_ms = (time.perf_counter() - t0) * 1000
+        latencies = []
+        text = ""
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            text = backend.transcribe(pcm, sample_rate)
+            latencies.append(time.perf_counter() - t0)
+        avg_s = sum(latencies) / len(latencies)
+        print(f"{label:<28}{load_ms:>10.1f}{avg_s * 1000:>14.1f}{avg_s / audio_s if audio_s else 0:>8.3f}  {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+人脸检测基准：对比原分辨率单次检测与两阶段（粗检 + 原分辨率精修）检测的耗时与精度。
+
+用法：
+    python -m benchmarks.face_detection video1.mp4 [video2.webm ...] --max-frames 30 --coarse-scale 0.5
+"""
+import argparse
+import time
+
+import av
+import numpy as np
+
+from config import FACE_DETECTION
+from tools.common.video import iter_keyframes
+from utils.face_engine import get_face_engine, detect_faces_batch, detector_is_batched, refine_face
+
+
+def _iou(a, b):
+    """两个 [x1, y1, x2, y2] 框的交并比"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _single_pass(model, frame):
+    faces = model.get(frame)
+    return faces[0] if faces else None
+
+
+def _two_stage(model, frame, coarse_scale, coarse_det_size):
+    bboxes, _ = detect_faces_batch([frame], model, scale=coarse_scale, input_size=coarse_det_size)[0]
+    if len(bboxes) == 0:
+        return None
+    return refine_face(frame, bboxes[0], model)
+
+
+def benchmark_video(video_path, max_frames, coarse_scale, coarse_det_size):
+    """
+    对单个视频的关键帧分别运行两种检测方式。
+    :return: dict，包含两种方式的逐帧耗时、检出率，以及以单次检测为基准的 bbox IoU、关键点误差、置信度差
+    """
+    model = get_face_engine()
+    stats = {
+        "frames": 0,
+        "single_ms": [], "two_stage_ms": [],
+        "single_found": 0, "two_stage_found": 0,
+        "iou": [], "kps_err": [], "score_diff": [],
+    }
+    with av.open(video_path) as container:
+        for frame in iter_keyframes(container, max_frames):
+            stats["frames"] += 1
+
+            t0 = time.perf_counter()
+            ref = _single_pass(model, frame)
+            stats["single_ms"].append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            face = _two_stage(model, frame, coarse_scale, coarse_det_size)
+            stats["two_stage_ms"].append((time.perf_counter() - t0) * 1000)
+
+            stats["single_found"] += ref is not None
+            stats["two_stage_found"] += face is not None
+            if ref is None or face is None:
+                continue
+            stats["iou"].append(_iou(ref.bbox, face.bbox))
+            # 关键点误差按人脸框对角线长度归一化
+            diag = float(np.hypot(ref.bbox[2] - ref.bbox[0], ref.bbox[3] - ref.bbox[1]))
+            stats["kps_err"].append(float(np.linalg.norm(ref.kps - face.kps, axis=1).mean()) / diag)
+            stats["score_diff"].append(float(face.det_score - ref.det_score))
+    return stats
+
+
+def _mean(values):
+    return float(np.mean(values)) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单次检测 vs 两阶段检测基准")
+    parser.add_argument("videos", nargs="+", help="待测视频路径")
+    parser.add_argument("--max-frames", type=int, default=30, help="每个视频最多测试的关键帧数")
+    parser.add_argument("--coarse-scale", type=float, default=FACE_DETECTION["coarse_scale"], help="粗检缩放比例")
+    parser.add_argument("--coarse-det-size", type=int, default=FACE_DETECTION["coarse_det_size"][0], help="粗检输入尺寸（正方形边长）")
+    args = parser.parse_args()
+
+    # 先加载模型，避免首帧耗时包含模型加载
+    engine = get_face_engine()
+    if detector_is_batched(engine):
+        print("检测模型：批量输出，detect_faces_batch 整批一次推理")
+    else:
+        print("检测模型：不支持批量输出，detect_faces_batch 逐帧检测（两阶段粗检均为单帧推理）")
+    coarse_det_size = (args.coarse_det_size, args.coarse_det_size)
+    print(f"{'视频':<32}{'帧数':>6}{'单次(ms)':>12}{'两阶段(ms)':>12}{'加速比':>8}{'检出(单/两)':>14}{'IoU':>8}{'关键点误差':>12}{'置信度差':>10}")
+    for video_path in args.videos:
+        s = benchmark_video(video_path, args.max_frames, args.coarse_scale, coarse_det_size)
+        single_ms, two_stage_ms = _mean(s["single_ms"]), _mean(s["two_stage_ms"])
+        print(
+            f"{video_path[-32:]:<32}{s['frames']:>6}{single_ms:>12.1f}{two_stage_ms:>12.1f}"
+            f"{single_ms / two_stage_ms if two_stage_ms else float('nan'):>8.2f}"
+            f"{s['single_found']:>7}/{s['two_stage_found']:<6}"
+            f"{_mean(s['iou']):>8.3f}{_mean(s['kps_err']):>12.4f}{_mean(s['score_diff']):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+建档面部特征分析请求基准：对比发送整段视频（video）与发送本地挑选的人脸帧（frames）两种方式的
+请求体大小与端到端耗时。
+
+用法（需要 .env 中的 CHAT_API_KEY / CHAT_API_BASE / CHAT_MODEL_NAME）：
+    python -m benchmarks.face_features_request face.mp4 --runs 3
+    python -m benchmarks.face_features_request face.mp4 --skip-llm   # 只统计请求体大小与本地准备耗时
+"""
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+from tools.user_profile_creation_tools import build_face_features_messages, analyze_face_features_with_llm
+
+MODES = ["video", "frames"]
+
+
+def request_bytes(messages) -> int:
+    """估算请求体大小：消息内容序列化后的字节数"""
+    return len(json.dumps([m.content for m in messages], ensure_ascii=False).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="面部特征分析 video / frames 两种输入方式基准")
+    parser.add_argument("video", help="待测面部视频路径")
+    parser.add_argument("--runs", type=int, default=3, help="每种方式的调用次数")
+    parser.add_argument("--skip-llm", action="store_true", help="不调用大模型，只统计请求体大小与本地准备耗时")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = {"configurable": {
+        "chat_model_name": os.getenv("CHAT_MODEL_NAME", ""),
+        "chat_api_base": os.getenv("CHAT_API_BASE", ""),
+        "chat_api_key": os.getenv("CHAT_API_KEY", ""),
+    }}
+
+    print(f"{'方式':<8}{'请求体(KB)':>12}{'准备(ms)':>12}{'端到端(ms)':>14}  结果")
+    for mode in MODES:
+        t0 = time.perf_counter()
+        messages = build_face_features_messages(args.video, mode)
+        prepare_ms = (time.perf_counter() - t0) * 1000
+        size_kb = request_bytes(messages) / 1024
+        if args.skip_llm:
+            print(f"{mode:<8}{size_kb:>12.1f}{prepare_ms:>12.1f}{'-':>14}")
+            continue
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            result = analyze_face_features_with_llm(args.video, config, mode)
+            e2e_ms = (time.perf_counter() - t0) * 1000
+            print(f"{mode:<8}{size_kb:>12.1f}{prepare_ms:>12.1f}{e2e_ms:>14.1f}  {json.dumps(result, ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
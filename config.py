@@ -19,6 +19,199 @@ MIRA_GREETING_PROMPT = """
 4. 询问用户想要体验哪项功能
 """
 
+# 人脸检测引擎配置
+FACE_ENGINE = {
+    "name": "buffalo_l",                  # insightface 模型包名称
+    "providers": ["CPUExecutionProvider"],  # ONNX Runtime 执行后端
+    "det_size": (640, 640),               # 检测输入尺寸
+    "warmup_on_startup": True,            # 启动时是否在后台预加载模型
+}
+
+# 人脸检测方式配置
+# 注意：默认 buffalo_l 的 SCRFD 检测模型（det_10g）导出时未保留批量维度（det_model.batched 为 False），
+# detect_faces_batch 在该模型下逐帧调用检测模型，不会整批推理；只有换用批量导出的检测模型时才会一次推理整批帧。
+FACE_DETECTION = {
+    "mode": "single",             # single: 原分辨率单次检测；two_stage: 先在缩小帧上粗检，再在原分辨率裁剪区域上精修
+    "coarse_scale": 0.5,          # 粗检前的帧缩放比例
+    "coarse_det_size": (320, 320),  # 粗检时的检测输入尺寸
+    "fine_det_size": (320, 320),  # 精修时裁剪区域的检测输入尺寸
+    "crop_padding": 0.3,          # 精修裁剪区域相对人脸框的边距比例
+}
+
+# 最佳人脸帧选取配置
+FACE_FRAME_SELECTION = {
+    "max_frames": 100,         # keyframe 采样方式下最多解码的关键帧数
+    "batch_size": 8,           # 每批处理的帧数（默认检测模型不支持批量输出，批内仍逐帧检测）
+    "early_exit_score": 0.8,   # 检测置信度达到该值即提前结束解码
+    "time_budget_s": 8.0,      # 单次选帧的时间预算（秒），超出即停止解码
+}
+
+# 视频帧采样配置
+FRAME_SAMPLING = {
+    "sampler": "seek",           # seek: 按时间均匀 seek 采样；keyframe: 顺序解码全部关键帧
+    "num_samples": 32,           # 采样帧数上限
+    "time_budget_s": 4.0,        # 采样的墙钟时间预算（秒）
+    "seek_threshold_s": 2.0,     # 与上一采样点间隔小于该值时继续顺序解码而不 seek
+    "fallback_interval_s": 0.5,  # 无法获取视频时长时的顺序采样间隔（秒）
+}
+
+# 人脸检测前的帧质量预筛选配置
+FRAME_PREFILTER = {
+    "enabled": True,
+    "window_size": 16,     # 每个预筛选窗口包含的解码帧数
+    "top_k": 4,            # 每个窗口只把质量分最高的 top_k 帧送入人脸检测
+    "thumb_width": 160,    # 计算质量分所用缩略图宽度
+    "motion_weight": 4.0,  # 运动惩罚系数，越大越偏向静止帧
+}
+
+# 最佳人脸帧结果缓存配置（以视频内容哈希为 key）
+FACE_FRAME_CACHE = {
+    "enabled": True,
+    "dir": "face_cache",   # 缓存目录
+    "max_size_mb": 50,     # 缓存图片总大小上限（MB）
+    "max_age_hours": 24,   # 缓存条目最大保留时间（小时）
+}
+
+# 送往远端分析服务前的人脸图片预处理配置
+FACE_IMAGE_TARGETS = {
+    # YouCam 肤质分析：保留足够分辨率以识别毛孔、细纹
+    "youcam": {"long_side": 1024, "max_bytes": 1_500_000, "padding": 0.6},
+    # 多模态大模型：分辨率越高图像 token 越多，面部区域 768 已足够
+    "vlm": {"long_side": 768, "max_bytes": 200_000, "padding": 0.4},
+    # 建档时的五官分析：需要完整脸型，边距更大
+    "face_features": {"long_side": 640, "max_bytes": 120_000, "padding": 0.6},
+}
+
+# 建档面部特征分析的输入方式
+FACE_FEATURES_INPUT = {
+    "mode": "frames",           # frames: 发送本地挑选的人脸帧；video: 发送整段视频
+    "num_samples": 16,          # 挑选人脸帧时的采样帧数
+    "max_frames": 3,            # 最多发送的人脸帧数
+    "profile_yaw_ratio": 0.25,  # 偏转比超过该值视为侧脸
+}
+
+# 建档流程中固定的提问话术（同时用于预合成语音短语库）
+PROFILE_CREATION_PROMPTS = {
+    "gender": "嗨～能告诉我你的性别吗？",
+    "age": "你今年多大啦？",
+    "face_video": "亲，能拍一段小视频让我看看你的脸吗？这样我才能更好地了解你的五官特征、肤色和肤质哦～",
+    "makeup_skill": "在化妆方面，你觉得自己有多厉害呢？给自己打个分吧（0-10分）～",
+    "skincare_skill": "那护肤呢？你觉得自己在护肤方面的水平如何（0-10分）？",
+    "preferences": "说说看，你最希望在护肤和化妆方面达到什么效果呢？有什么特别喜欢或不喜欢的风格吗？",
+    "name": "最后一个问题啦～我该怎么称呼你呢？",
+    "done": "您的用户档案已经生成啦，可以进入“个人档案”页面查看哦",
+}
+
+# 预合成语音短语库：固定话术按所有音色提前合成，运行时直接读取，不再调用 TTS
+PHRASE_BANK = {
+    "dir": "phrase_bank",
+    "model": "cosyvoice-v1",
+    "voices": ["longwan", "longcheng", "longhua", "longxiaochun"],
+    "build_on_startup": True,  # 启动时后台补齐缺失的短语音频（也可离线执行 python -m utils.phrase_bank）
+}
+
+# 单次上传视频的媒体资源包：整段视频只解码一次，供语音识别、人脸提取、面部特征分析共用
+MEDIA_BUNDLE = {
+    "num_frames": 24,            # 按时间均匀保留的采样帧数
+    "max_long_side": 1280,       # 采样帧长边上限，控制共享内存占用
+    "fallback_interval_s": 0.5,  # 无法获取时长时的采样间隔（秒）
+    "audio_sample_rate": 16000,  # 音频重采样率（单声道 16bit）
+    "prefetch_best_face": True,  # 处于肤质检测流程时，视频上传后与语音识别并行提取最佳人脸帧
+    "prefetch_workers": 4,       # 预取任务线程数（线程只负责等待，计算在视频处理进程池中）
+}
+
+# 语音识别配置
+ASR = {
+    "backend": "google",        # google: 远端 Google Web Speech；faster_whisper: 本地 CPU 离线识别
+    "language": "zh-CN",
+    "warmup_on_startup": True,  # 启动时后台预加载本地模型
+    "google": {
+        "timeout_s": 15,        # 单次请求超时（秒）
+    },
+    "faster_whisper": {
+        "model": "small",       # 模型名称或本地模型目录
+        "device": "cpu",
+        "compute_type": "int8",
+        "cpu_threads": 4,       # 单次识别使用的 CPU 线程数
+        "num_workers": 1,       # 可并行执行的识别数
+        "beam_size": 1,
+        "language": "zh",
+    },
+    # 识别前的语音活动检测：裁掉静音，长语音分段并行识别
+    "vad": {
+        "enabled": True,
+        "frame_ms": 20,             # 能量计算的帧长
+        "noise_percentile": 10,     # 以该分位的帧能量估计底噪
+        "margin_db": 10.0,          # 高于底噪多少 dB 视为语音
+        "min_energy_db": 30.0,      # 语音帧能量的绝对下限（dB）
+        "hangover_ms": 200,         # 语音段两端延长，避免切掉字头字尾
+        "min_silence_ms": 500,      # 短于该时长的静音不切分
+        "min_speech_ms": 200,       # 短于该时长的语音段丢弃
+        "max_segment_s": 15.0,      # 单段最长时长，超过后在能量最低处切开
+        "max_parallel": 4,          # 分段并行识别的并发数
+        "joiner": "",               # 拼接分段文本的分隔符
+    },
+}
+
+# 意图识别快速路由（仅用于无进行中流程时的新意图识别）：
+# 关键词正则 → 本地字符 n-gram 朴素贝叶斯分类器 → 大模型，前一级无法确定时才进入下一级
+INTENT_ROUTER = {
+    "enabled": True,
+    # 各意图的关键词正则，只有一个意图命中时才直接采用
+    "patterns": {
+        # 只匹配不涉及产品的检测请求；“测一下我的肤质适合什么面霜”这类产品问题交给后续层级判断
+        "肤质检测": [
+            r"^(?!.*(适合|推荐|产品|面霜|粉底|口红|精华|乳液|防晒|成分|护肤品|化妆品|用什么|买什么)).*(检测|测一?下|测试|分析|看看).{0,4}(皮肤|肤质)",
+            r"^(?!.*(适合|推荐|产品|面霜|粉底|口红|精华|乳液|防晒|成分|护肤品|化妆品|用什么|买什么)).*(我|我的)(皮肤|肤质)是什么",
+        ],
+        "创建用户档案": [r"(创建|建立|新建|建|更新|修改).{0,4}(档案|个人信息|资料)"],
+        "产品分析": [r"(推荐|分析|识别).{0,6}(产品|面霜|粉底|口红|精华|乳液|防晒|成分)", r"这(个|款|支|瓶)(产品|护肤品|化妆品)"],
+        "化妆或护肤引导": [r"(教我|想学|学习|怎么|如何)(画|化)", r"(画|化)(一个|个)?.{0,3}(妆|眼线|眉毛|眼影)"],
+        "聊天互动": [r"^(你好|您好|早上好|中午好|晚上好|嗨|哈喽|hi|hello)[呀啊!！。~～\s]*$"],
+    },
+    # 本地分类器：用种子样例和历史上由大模型判定的意图训练，后验概率达到阈值才采用
+    "classifier": {
+        "ngram_range": (1, 3),      # 字符 n-gram 长度范围
+        "alpha": 0.5,               # 平滑系数
+        "min_confidence": 0.95,     # 采用分类结果的最低后验概率
+        "min_examples": 60,         # 训练样本（含种子样例）少于该数量时不启用分类器
+    },
+    "seed_examples": {
+        "肤质检测": ["帮我检测下皮肤", "看看我的皮肤状况", "我的皮肤是什么类型", "帮我看看脸上的问题", "测一下肤质", "最近皮肤不太好帮我分析下"],
+        "创建用户档案": ["我要创建档案", "更新我的信息", "帮我建个档案", "修改个人资料", "新建用户档案", "我想建立个人档案"],
+        "产品分析": ["推荐适合我的粉底液", "有什么好用的面霜推荐", "这个产品是什么", "帮我看看这个护肤品", "分析一下这个产品的成分", "这个产品适合我吗"],
+        "化妆或护肤引导": ["教我画眼线", "想学习画眉毛", "我想画一个妆", "怎么化日常妆", "教我护肤步骤", "带我化个约会妆"],
+        "聊天互动": ["你好", "早上好", "今天心情不好", "我昨天买了新口红", "你觉得我适合什么妆容", "陪我聊聊天"],
+    },
+    "log_path": "intent_data/intent_log.jsonl",  # 大模型判定的意图记录，用于持续训练分类器
+    "max_log_examples": 5000,                    # 启动时最多加载的历史记录条数
+    "max_text_chars": 200,                       # 超过该长度的文本不写入记录、不参与训练（避免长提示词稀释特征）
+    # 意图识别与闲聊回复合并为一次流式调用：先输出路由标记，是闲聊则继续输出回复，否则立即中止生成
+    "fused_chat": {
+        "enabled": True,
+        "max_route_chars": 40,     # 超过该长度仍未解析出路由标记时，按闲聊处理并把已生成内容作为回复
+    },
+}
+
+# 大模型客户端配置：同一 (接口地址, API Key) 共用一个长连接池，连接数上限即该 Key 的并发上限
+LLM_CLIENT = {
+    "max_connections": 8,        # 每个 Key 的最大并发连接数，超出的调用排队等待空闲连接
+    "max_keepalive": 8,          # 保持长连接的空闲连接数
+    "keepalive_expiry_s": 60,    # 空闲连接保持时长（秒）
+    "connect_timeout_s": 10,
+    "read_timeout_s": 120,       # 单次读取超时（流式输出时为相邻两个数据块的间隔上限）
+    "pool_timeout_s": 60,        # 等待空闲连接的超时
+    "max_retries": 2,
+}
+
+# 视频/人脸处理进程池配置
+VIDEO_POOL = {
+    "enabled": True,
+    "max_workers": 2,    # 常驻 worker 进程数，每个进程各持有一份人脸模型
+    "max_pending": 8,    # 在途任务上限（排队 + 执行中），超过后提交方阻塞等待
+    "submit_timeout_s": 60,  # 提交方等待在途名额的上限（秒），超时抛出 TimeoutError，避免进程池卡死时无限等待
+}
+
 LOGGERS = {
     # 应用主日志
     "app": {
@@ -87,6 +280,28 @@ LOGGERS = {
         "propagate": False        # 是否传播到父级日志器
     },
 
+    # 语音识别日志
+    "asr": {
+        "level": "DEBUG",
+        "console": True,
+        "file": True,
+        "file_path": "logs/asr.log",
+        "format": "[%(asctime)s][%(name)s][%(funcName)s %(lineno)d] %(message)s",  # 日志格式
+        "clear_log": True,  # 启动时清空日志文件
+        "propagate": False        # 是否传播到父级日志器
+    },
+
+    # 大模型调用日志
+    "llm": {
+        "level": "DEBUG",
+        "console": True,
+        "file": True,
+        "file_path": "logs/llm.log",
+        "format": "[%(asctime)s][%(name)s][%(funcName)s %(lineno)d] %(message)s",  # 日志格式
+        "clear_log": True,  # 启动时清空日志文件
+        "propagate": False        # 是否传播到父级日志器
+    },
+
     # 其他模块日志配置
     
 }
@@ -5,7 +5,7 @@ from langgraph.graph import StateGraph, END, START
 from state import CareMakeupGuideState, ConfigState
 from langgraph.config import get_stream_writer
 from langgraph.types import interrupt
-from langchain_openai import ChatOpenAI
+from utils.llm import get_chat_model
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import SystemMessage
@@ -44,12 +44,7 @@ def generate_plan(state: Annotated[dict, InjectedState], config: RunnableConfig)
     ).format(
         plan_section=f"【当前计划】：{state['plan']}\n" if state.get("plan") else ""
     )
-    llm = ChatOpenAI(
-        model=config["configurable"].get("chat_model_name"),
-        openai_api_base=config["configurable"].get("chat_api_base"),
-        openai_api_key=config["configurable"].get("chat_api_key"),
-        streaming=False
-    ).with_structured_output(method="json_mode")
+    llm = get_chat_model(config["configurable"], output="json")
     msg = "完成计划生成，请向用户简要说明当前计划内容，并请求确认" if not state.get("plan") else "生成新计划，请向用户简要说明计划内容，并请求确认"
     response = llm.invoke([SystemMessage(content=system_prompt)] + state.get("messages", []))
     
@@ -122,17 +117,12 @@ def chatbot(state: CareMakeupGuideState, config: RunnableConfig):
     stream_writer({"type": "progress", "content": "正在分析..."})
     content_buffer = ""
     first_chunk = True
-    llm = ChatOpenAI(
-        model=config["configurable"].get("chat_model_name"),
-        openai_api_base=config["configurable"].get("chat_api_base"),
-        openai_api_key=config["configurable"].get("chat_api_key"),
-        streaming=True
-    )
+    llm = get_chat_model(config["configurable"], streaming=True)
     llm_with_tools = llm.bind_tools([generate_plan, request_user_input])
     for chunk in llm_with_tools.stream(messages):
         if hasattr(chunk, "content") and chunk.content:
             content_buffer += chunk.content
-            stream_writer({"type": "progress", "content": content_buffer})
+            stream_writer({"type": "progress", "content": content_buffer, "streaming": True})
         if first_chunk:
             buffer = chunk
             first_chunk = False
@@ -5,12 +5,13 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.config import get_stream_writer
 from state import MiraState, ConfigState
-from tools.mira_tools import recognize_intent, multimodal_chat_agent
+from tools.mira_tools import recognize_intent, multimodal_chat_agent, route_and_reply, is_greeting_turn
 from graphs.user_profile_creation_graph import user_profile_creation_graph
 from graphs.skin_analysis_graph import skin_analysis_graph
 from graphs.product_analysis_graph import product_analysis_graph
 from graphs.care_makeup_guide_graph import care_makeup_guide_graph
 from utils.loggers import MiraLog
+from config import INTENT_ROUTER
 from typing_extensions import Literal
 
 
@@ -29,17 +30,25 @@ def mira(state: MiraState, config: RunnableConfig) -> Command[Literal["user_prof
     """
     writer = get_stream_writer()
     writer({"type": "progress", "content": "正在识别意图..."})
-    intent = recognize_intent(state, config)
+    reply = None
+    if is_greeting_turn(state, config):
+        # 欢迎语提示词直接生成问候，不做意图识别，也不写入意图记录
+        intent = "聊天互动"
+    elif INTENT_ROUTER["fused_chat"]["enabled"] and state.get("current_flow") is None:
+        # 意图识别与闲聊回复合并为一次调用，闲聊时直接复用已开始的回复流
+        intent, reply = route_and_reply(state, config)
+    else:
+        intent = recognize_intent(state, config)
     MiraLog("mira_graph", f"意图识别结果: {intent}")
     
     if intent in intent_to_subgraph:
         return Command(goto=intent_to_subgraph[intent], update={"current_flow": intent})
     else:
-        response = multimodal_chat_agent(state["messages"], config['configurable'], streaming=True)
+        response = reply if reply is not None else multimodal_chat_agent(state["messages"], config['configurable'], streaming=True)
         buffer = ""
         for chunk in response:
             buffer += chunk
-            writer({"type": "progress", "content": buffer})
+            writer({"type": "progress", "content": buffer, "streaming": True})
         writer({"type": "final", "content": {"response": buffer}})
         return {"messages": [AIMessage(content=buffer)], "current_flow": None}
 
@@ -76,6 +85,7 @@ def call_skin_analysis_subgraph(state: MiraState, config: RunnableConfig):
         "user_profile": state.get("user_profile"),
         "products_directory": state.get("products_directory"),
         "messages": state.get("skin_analysis_messages", []) + state.get("messages", [])[-1:],
+        "current_video_path": state.get("current_video_path"),
     }
     subgraph_output = skin_analysis_graph.invoke(subgraph_input, config=config)
     return {
@@ -1,7 +1,7 @@
 """
 产品识别子流程 Graph，节点实现如下。
 """
-from langchain_openai import ChatOpenAI
+from utils.llm import get_chat_model
 from langchain_tavily import TavilySearch
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 from langgraph.graph import StateGraph, END, START
@@ -120,12 +120,7 @@ def chatbot(state: ProductAnalysisState, config: RunnableConfig):
         f"{formatted_info}"
     )
 
-    llm = ChatOpenAI(
-        model=config["configurable"].get("chat_model_name"),
-        openai_api_base=config["configurable"].get("chat_api_base"),
-        openai_api_key=config["configurable"].get("chat_api_key"),
-        streaming=True
-    )
+    llm = get_chat_model(config["configurable"], streaming=True)
     llm_with_tools = llm.bind_tools([tool_search, add_product_to_directory_tool])
     messages = [
         SystemMessage(content=system_message),
@@ -137,7 +132,7 @@ def chatbot(state: ProductAnalysisState, config: RunnableConfig):
     for chunk in llm_with_tools.stream(messages):
         if hasattr(chunk, "content") and chunk.content:
             content_buffer += chunk.content
-            stream_writer({"type": "progress", "content": content_buffer})
+            stream_writer({"type": "progress", "content": content_buffer, "streaming": True})
         if first_chunk:
             buffer = chunk
             first_chunk = False
@@ -2,15 +2,31 @@
 肤质检测子流程 Graph，节点实现如下。
 """
 import os
-import base64
 from pathlib import Path
 from langgraph.graph import StateGraph, END, START
 from state import SkinAnalysisState, ConfigState
 from langgraph.config import get_stream_writer
 from langgraph.types import interrupt
 from utils.loggers import MiraLog
-from tools.skin_analysis_tools import extract_best_face_frame, skin_analysis, skin_feedback, skin_analysis_by_QwenYi, get_image_base64
+from tools.skin_analysis_tools import extract_best_face, skin_analysis, skin_feedback, skin_analysis_by_QwenYi, get_image_base64
 from langchain_core.runnables import RunnableConfig
+from utils.video_pool import run_in_video_pool
+from tools.common.media import get_media_bundle
+
+_NOT_PREFETCHED = object()
+
+def _join_prefetched_best_face(bundle):
+    """等待上传时预取的最佳人脸帧结果；没有预取或预取失败时返回 _NOT_PREFETCHED"""
+    future = bundle.pop_prefetched("best_face") if bundle else None
+    if future is None:
+        return _NOT_PREFETCHED
+    try:
+        best_face = future.result()
+    except Exception as e:
+        MiraLog("skin_analysis", f"预取最佳人脸帧失败，重新提取: {e}", "WARNING")
+        return _NOT_PREFETCHED
+    MiraLog("skin_analysis", "使用预取的最佳人脸帧结果")
+    return best_face
 
 # 1. 输入采集节点
 def wait_for_video_node(state: SkinAnalysisState):
@@ -21,23 +37,21 @@ def wait_for_video_node(state: SkinAnalysisState):
     """
     MiraLog("skin_analysis", f"进入肤质检测子图")
 
-    # 将video转成base64
-    if state["messages"][-1].content[0]["type"] != "video_url":
+    # 优先直接使用上传视频的文件路径，避免 base64 编解码
+    video_path = state.get("current_video_path")
+    if video_path and os.path.exists(video_path):
+        MiraLog("skin_analysis", f"使用上传视频文件: {video_path}")
+    elif state["messages"][-1].content[0]["type"] != "video_url":
         while True:
             MiraLog("skin_analysis", f"肤质检测的视频输入不存在")
             response = interrupt({"type": "interrupt", "content": "请上传面部视频以进行肤质检测。"})
             video = response.get("video")
             if video and os.path.exists(video):
                 break
-        try:
-            with open(video, "rb") as video_file:
-                video_bytes = video_file.read()
-                video_base64 = base64.b64encode(video_bytes).decode('utf-8')
-                state["current_video_base64"] = video_base64
-                MiraLog("skin_analysis", f"视频转换为base64成功，路径: {video}, 转换后长度: {len(video_base64)}")
-        except Exception as e:
-            MiraLog("skin_analysis", f"视频转换为base64失败: {e}", "ERROR")
+        state["current_video_path"] = video
+        MiraLog("skin_analysis", f"使用上传视频文件: {video}")
     else:
+        # 兼容只有 data URL 的消息
         video_url = state["messages"][-1].content[0]["video_url"]["url"]
         state["current_video_base64"] = video_url
     return state
@@ -49,31 +63,34 @@ def video_analysis_node(state: SkinAnalysisState):
     :param state: 当前 State
     :return: (新 State, 进度消息)
     """
-    # 调用 extract_best_face_frame，更新 best_face_image/face_detected
+    # 调用 extract_best_face，更新 best_face_image/face_detected
     MiraLog("skin_analysis", "进入视频分析节点")
     writer = get_stream_writer()
 
     while True:
         writer({"type": "progress", "content": "正在提取最佳人脸图片..."})
-        best_face_path = extract_best_face_frame(state["current_video_base64"])
-        if not best_face_path:
+        video = state.get("current_video_path") or state.get("current_video_base64")
+        # 本轮已登记 MediaBundle 时优先使用上传时预取的结果，其次使用其解码好的采样帧
+        bundle = get_media_bundle(video)
+        best_face = _join_prefetched_best_face(bundle)
+        if best_face is _NOT_PREFETCHED:
+            frames = bundle.frames if bundle else None
+            best_face = run_in_video_pool(extract_best_face, frames or video)
+        if not best_face:
             while True:
                 response = interrupt({"type": "interrupt", "content": "未检测到人脸，请重新输入视频。"})
                 video = response.get("video")
                 if video and os.path.exists(video):
                     break
-            try:
-                with open(video, "rb") as video_file:
-                    video_bytes = video_file.read()
-                    video_base64 = base64.b64encode(video_bytes).decode('utf-8')
-                    state["current_video_base64"] = video_base64
-                    MiraLog("skin_analysis", f"视频转换为base64成功，路径: {video}, 转换后长度: {len(video_base64)}")
-            except Exception as e:
-                MiraLog("skin_analysis", f"视频转换为base64失败: {e}", "ERROR")
+            state["current_video_path"] = video
+            state["current_video_base64"] = None
+            MiraLog("skin_analysis", f"使用重新上传的视频文件: {video}")
         else:
             break
 
+    best_face_path = best_face.pop("path")
     state["best_face_path"] = best_face_path
+    state["best_face_info"] = best_face
     state["face_detected"] = True
     
     # 转换为base64用于前端展示
@@ -97,9 +114,9 @@ def node_skin_analysis(state: SkinAnalysisState, config: RunnableConfig):
 
     writer({"type": "progress", "content": "正在进行肤质AI检测..."})
     if config["configurable"].get("use_youcam"):
-        skin_analysis_result = skin_analysis(best_face_path, config)
+        skin_analysis_result = skin_analysis(best_face_path, config, state.get("best_face_info"))
     else:
-        skin_analysis_result = skin_analysis_by_QwenYi(best_face_path, config)
+        skin_analysis_result = skin_analysis_by_QwenYi(best_face_path, config, state.get("best_face_info"))
     state["user_profile"]["skin_quality"] = skin_analysis_result.get("skin_quality")
     state["skin_analysis_result"] = skin_analysis_result
    
@@ -121,7 +138,7 @@ def node_result_feedback(state: SkinAnalysisState, config: RunnableConfig):
     analysis_report = ""
     for chunk in response:
         analysis_report += chunk
-        writer({"type": "progress", "content": analysis_report})
+        writer({"type": "progress", "content": analysis_report, "streaming": True})
     state["analysis_report"] = analysis_report
     
     # 清理临时文件
@@ -10,17 +10,18 @@ from langchain_core.messages import AIMessage, HumanMessage
 from tools.common.formatters import format_messages
 from utils.loggers import MiraLog
 from langchain_core.runnables import RunnableConfig
+from config import PROFILE_CREATION_PROMPTS
 
 # 1. 性别选择节点
 def gender_selection_node(state: UserProfileEditState, config: RunnableConfig):
     MiraLog("user_profile_creation", "进入创建用户档案子图")
     MiraLog("user_profile_creation", f"进入节点：性别选择")
-    response = interrupt({"type": "interrupt", "content": "嗨～能告诉我你的性别吗？"}).get("text")
+    response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["gender"]}).get("text")
     # 更新 State
     return {
         "basic_info": {"gender": response}, 
         "messages": [
-            AIMessage(content="嗨～能告诉我你的性别吗？"),
+            AIMessage(content=PROFILE_CREATION_PROMPTS["gender"]),
             HumanMessage(content=response)
         ]
     }
@@ -28,12 +29,12 @@ def gender_selection_node(state: UserProfileEditState, config: RunnableConfig):
 # 2. 年龄输入节点
 def age_input_node(state: UserProfileEditState):
     MiraLog("user_profile_creation", f"进入节点：年龄输入")
-    response = interrupt({"type": "interrupt", "content": "你今年多大啦？"}).get("text")
+    response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["age"]}).get("text")
     # 更新 State
     return {
         "basic_info": {"age": response}, 
         "messages": [
-            AIMessage(content="你今年多大啦？"),
+            AIMessage(content=PROFILE_CREATION_PROMPTS["age"]),
             HumanMessage(content=response)
         ]
     }
@@ -43,11 +44,11 @@ def face_feature_analysis_node(state: UserProfileEditState, config: RunnableConf
     writer = get_stream_writer()
     MiraLog("user_profile_creation", f"进入节点：面部特征采集与分析")
     while True:
-        response = interrupt({"type": "interrupt", "content": "亲，能拍一段小视频让我看看你的脸吗？这样我才能更好地了解你的五官特征、肤色和肤质哦～"})
+        response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["face_video"]})
         if "video" in response:
             break
         else:
-            response = interrupt({"type": "interrupt", "content": "亲，能拍一段小视频让我看看你的脸吗？这样我才能更好地了解你的五官特征、肤色和肤质哦～"})
+            response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["face_video"]})
     video_path = response.get("video")
     # 工具调用：分析面部特征
     writer({"type": "progress", "content": "让我仔细看看你的面部特征..."})
@@ -87,11 +88,11 @@ def face_feature_analysis_node(state: UserProfileEditState, config: RunnableConf
 # 4. 化妆专业度打分节点
 def makeup_skill_node(state: UserProfileEditState):
     MiraLog("user_profile_creation", f"进入节点：化妆专业度打分")
-    response = interrupt({"type": "interrupt", "content": "在化妆方面，你觉得自己有多厉害呢？给自己打个分吧（0-10分）～"}).get("text")
+    response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["makeup_skill"]}).get("text")
     return {
         "user_profile": {"makeup_skill_level": response},
         "messages": [
-            AIMessage(content="在化妆方面，你觉得自己有多厉害呢？给自己打个分吧（0-10分）～"),
+            AIMessage(content=PROFILE_CREATION_PROMPTS["makeup_skill"]),
             HumanMessage(content=response)
         ]
     }
@@ -99,11 +100,11 @@ def makeup_skill_node(state: UserProfileEditState):
 # 5. 护肤专业度打分节点
 def skincare_skill_node(state: UserProfileEditState):
     MiraLog("user_profile_creation", f"进入节点：护肤专业度打分")
-    response = interrupt({"type": "interrupt", "content": "那护肤呢？你觉得自己在护肤方面的水平如何（0-10分）？"}).get("text")
+    response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["skincare_skill"]}).get("text")
     return {
         "basic_info": {"skincare_skill_level": response},
         "messages": [
-            AIMessage(content="那护肤呢？你觉得自己在护肤方面的水平如何（0-10分）？"),
+            AIMessage(content=PROFILE_CREATION_PROMPTS["skincare_skill"]),
             HumanMessage(content=response)
         ]
     }
@@ -111,11 +112,11 @@ def skincare_skill_node(state: UserProfileEditState):
 # 6. 个人诉求与偏好收集节点
 def user_preferences_node(state: UserProfileEditState):
     MiraLog("user_profile_creation", f"进入节点：个人诉求与偏好收集")
-    response = interrupt({"type": "interrupt", "content": "说说看，你最希望在护肤和化妆方面达到什么效果呢？有什么特别喜欢或不喜欢的风格吗？"}).get("text")
+    response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["preferences"]}).get("text")
     return {
         "basic_info": {"user_preferences": response},
         "messages": [
-            AIMessage(content="说说看，你最希望在护肤和化妆方面达到什么效果呢？有什么特别喜欢或不喜欢的风格吗？"),
+            AIMessage(content=PROFILE_CREATION_PROMPTS["preferences"]),
             HumanMessage(content=response)
         ]
     }
@@ -123,11 +124,11 @@ def user_preferences_node(state: UserProfileEditState):
 # 7. 用户名采集节点
 def name_input_node(state: UserProfileEditState):
     MiraLog("user_profile_creation", f"进入节点：用户名采集")
-    response = interrupt({"type": "interrupt", "content": "最后一个问题啦～我该怎么称呼你呢？"}).get("text")
+    response = interrupt({"type": "interrupt", "content": PROFILE_CREATION_PROMPTS["name"]}).get("text")
     return {
         "basic_info": {"name": response},
         "messages": [
-            AIMessage(content="最后一个问题啦～我该怎么称呼你呢？"),
+            AIMessage(content=PROFILE_CREATION_PROMPTS["name"]),
             HumanMessage(content=response)
         ]
     }
@@ -136,7 +137,7 @@ def name_input_node(state: UserProfileEditState):
 def profile_generate_node(state: UserProfileEditState):
     MiraLog("user_profile_creation", f"进入节点：档案生成与保存")
     writer = get_stream_writer()
-    msg = f"您的用户档案已经生成啦，可以进入“个人档案”页面查看哦"
+    msg = PROFILE_CREATION_PROMPTS["done"]
     state['user_profile'].update(state['basic_info'])
     writer({"type": "final", "content": {"response": msg, "markdown": state["basic_info"], "profile": state["basic_info"]}})
     return state
@@ -184,6 +184,7 @@ class MiraState(TypedDict, total=False):
     products_directory: Annotated[list[Product], list_merge_reducer]
     messages: Annotated[List[AnyMessage], add_messages]
     current_flow: Optional[str]
+    current_video_path: Optional[str]  # 本轮上传视频的文件路径
 
     # 子图的messages
     skin_analysis_messages: List[AnyMessage]
@@ -198,9 +199,11 @@ class SkinAnalysisState(TypedDict, total=False):
     current_flow: Optional[str]
 
     # 中间产物
-    current_video_base64: Optional[str]
+    current_video_path: Optional[str]   # 待分析视频的文件路径
+    current_video_base64: Optional[str]  # 无文件路径时的 base64 / data URL 视频（兼容）
     best_face_image: Optional[str]   # 最佳脸部图片base64编码
     best_face_path: Optional[str]   # 最佳脸部图片临时文件路径
+    best_face_info: Optional[Dict[str, Any]]  # 最佳脸部的人脸框、关键点、置信度等
     face_detected: Optional[bool]    # 是否检测到人脸
     skin_analysis_result: Optional[Dict[str, Any]]   # JSON字符串形式的肤质分析结果
     analysis_report: Optional[str]        # AI生成的个性化解读
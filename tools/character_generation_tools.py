@@ -2,7 +2,7 @@
 角色生成相关工具
 """
 from typing import Dict, Any
-from langchain_openai import ChatOpenAI
+from utils.llm import get_chat_model
 from langchain.prompts import ChatPromptTemplate
 from state import CharacterSetting
 from tools.common.utils import fill_config_with_env
@@ -46,12 +46,7 @@ def generate_character_setting(chat_style: str, model_config: Dict[str, Any]) ->
         CharacterSetting: 生成的角色设定
     """
     model_config = fill_config_with_env(model_config)
-    llm = ChatOpenAI(
-        model=model_config.get("chat_model_name", ""),
-        openai_api_base=model_config.get("chat_api_base", ""),
-        openai_api_key=model_config.get("chat_api_key", ""),
-        temperature=0.7
-    ).with_structured_output(method="json_mode")
+    llm = get_chat_model(model_config, output="json", temperature=0.7)
     
     prompt = ChatPromptTemplate.from_template(CHARACTER_GENERATION_PROMPT)
     chain = prompt | llm
@@ -3,6 +3,7 @@ import base64
 import mimetypes
 from langchain_core.messages import HumanMessage
 from utils.loggers import MiraLog
+from tools.common.media import get_media_bundle
 import os
 from PIL import Image
 from typing import Union, List, Dict, Any
@@ -16,9 +17,13 @@ def format_messages(video, text):
     # 处理视频
     if video and isinstance(video, str) and os.path.exists(video):
         try:
-            # 读取视频文件并转换为base64
-            with open(video, "rb") as video_file:
-                video_base64 = base64.b64encode(video_file.read()).decode("utf-8")
+            # 本轮已登记 MediaBundle 时复用其 base64 编码，否则读取视频文件并转换为base64
+            bundle = get_media_bundle(video)
+            if bundle:
+                video_url = bundle.data_url
+            else:
+                with open(video, "rb") as video_file:
+                    video_url = f"data:video/mp4;base64,{base64.b64encode(video_file.read()).decode('utf-8')}"
             
             # 构建符合API要求的消息格式
             messages = [
@@ -28,7 +33,7 @@ def format_messages(video, text):
                         {
                             "type": "video_url",
                             "video_url": {
-                                "url": f"data:video/mp4;base64,{video_base64}"
+                                "url": video_url
                             }
                         }
                     ]
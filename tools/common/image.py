@@ -0,0 +1,94 @@
+"""
+图片预处理：基于人脸框/关键点裁剪面部区域，并按目标服务的分辨率与字节预算编码 JPEG。
+"""
+from typing import Optional
+
+from config import FACE_IMAGE_TARGETS
+from utils.loggers import MiraLog
+
+
+def crop_face(image, bbox, kps=None, padding: float = 0.5):
+    """
+    以人脸为中心裁剪带边距的正方形区域。有关键点时以关键点中心定位，避免人脸框偏移。
+    :param image: BGR ndarray
+    :param bbox: [x1, y1, x2, y2, ...]
+    :param kps: 5 点关键点 [[x, y], ...]，可选
+    :param padding: 相对人脸框边长的边距比例
+    :return: 裁剪后的 BGR ndarray
+    """
+    import numpy as np
+
+    h, w = image.shape[:2]
+    x1, y1, x2, y2 = [float(v) for v in bbox[:4]]
+    if kps is not None and len(kps):
+        cx, cy = np.asarray(kps, dtype=np.float32).mean(axis=0)
+    else:
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    half = max(x2 - x1, y2 - y1) * (1 + 2 * padding) / 2
+    left, top = max(int(cx - half), 0), max(int(cy - half), 0)
+    right, bottom = min(int(cx + half), w), min(int(cy + half), h)
+    if right <= left or bottom <= top:
+        return image
+    return image[top:bottom, left:right]
+
+
+def resize_long_side(image, long_side: int):
+    """等比缩小到长边不超过 long_side，不放大"""
+    import cv2
+
+    h, w = image.shape[:2]
+    scale = long_side / max(h, w)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(int(w * scale), 1), max(int(h * scale), 1)), interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg_to_budget(image, max_bytes: int, min_quality: int = 50, max_quality: int = 95) -> bytes:
+    """
+    自适应 JPEG 质量编码：二分查找不超过 max_bytes 的最高质量；最低质量仍超出预算时逐步缩小分辨率。
+    :return: JPEG 字节
+    """
+    import cv2
+
+    while True:
+        best = None
+        low, high = min_quality, max_quality
+        while low <= high:
+            quality = (low + high) // 2
+            ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                raise ValueError("JPEG 编码失败")
+            if buf.nbytes <= max_bytes:
+                best = buf
+                low = quality + 1
+            else:
+                high = quality - 1
+        if best is not None:
+            return best.tobytes()
+        h, w = image.shape[:2]
+        if max(h, w) <= 64:
+            return buf.tobytes()
+        image = cv2.resize(image, (int(w * 0.8), int(h * 0.8)), interpolation=cv2.INTER_AREA)
+
+
+def prepare_face_image(image_path: str, face_info: Optional[dict], target: str) -> bytes:
+    """
+    为远端分析服务准备人脸图片：按人脸框裁剪面部区域、缩放到目标分辨率并编码到字节预算以内。
+    :param image_path: 最佳帧图片路径
+    :param face_info: extract_best_face 返回的 bbox/kps 信息，为空时只做缩放与编码
+    :param target: FACE_IMAGE_TARGETS 中的目标服务名称，如 "youcam"、"vlm"
+    :return: JPEG 字节
+    """
+    import cv2
+
+    spec = FACE_IMAGE_TARGETS[target]
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"读取图片失败: {image_path}")
+    original_shape = image.shape
+    if face_info and face_info.get("bbox"):
+        image = crop_face(image, face_info["bbox"], face_info.get("kps"), spec["padding"])
+    image = resize_long_side(image, spec["long_side"])
+    jpeg_bytes = encode_jpeg_to_budget(image, spec["max_bytes"])
+    MiraLog("skin_analysis", f"[prepare_face_image] {target}: {original_shape[1]}x{original_shape[0]} -> {image.shape[1]}x{image.shape[0]}, {len(jpeg_bytes)} 字节")
+    return jpeg_bytes
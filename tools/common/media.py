@@ -0,0 +1,353 @@
+"""
+单次上传视频的媒体资源包（MediaBundle）：音频流与视频流按需分别解码、各自只解码一次，
+向语音识别、人脸提取、面部特征分析等各个环节提供音频 PCM、采样帧和编码后的原始字节，
+并在本轮对话结束时统一释放。
+"""
+import base64
+import hashlib
+import mimetypes
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from config import MEDIA_BUNDLE
+from utils.loggers import MiraLog
+
+
+@dataclass(frozen=True)
+class SharedFrames:
+    """
+    存放在共享内存中的采样帧句柄，可以 pickle 后传给视频处理进程池，子进程按名称挂载、零拷贝读取。
+    """
+    name: str
+    shape: tuple
+    dtype: str
+    content_hash: Optional[str] = None
+
+    @contextmanager
+    def attached(self):
+        """挂载共享内存，返回 (N, H, W, 3) 的 BGR ndarray 视图，退出时解除挂载（不释放）"""
+        import numpy as np
+        from multiprocessing import shared_memory
+
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            frames = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+            yield frames
+            del frames
+        finally:
+            shm.close()
+
+    def iter_frames(self):
+        """逐帧产出共享内存中帧的副本（副本在共享内存释放后依然有效）"""
+        import numpy as np
+
+        with self.attached() as frames:
+            for frame in frames:
+                yield np.array(frame)
+
+
+def _resample_to_pcm(resampler, frame) -> bytes:
+    """将一帧音频重采样为 PCM 字节，frame 为 None 时冲刷重采样器内部缓存"""
+    return b"".join(resampled.to_ndarray().tobytes() for resampled in resampler.resample(frame))
+
+
+def decode_audio_pcm(path: str, audio_rate: int = None) -> bytes:
+    """
+    在进程内用 PyAV 只解复用音频流，重采样为单声道 16bit PCM，不启动 ffmpeg 子进程、不写临时文件。
+    :return: PCM 字节，视频不含音频流时返回空字节
+    """
+    import av
+
+    audio_rate = audio_rate or MEDIA_BUNDLE["audio_sample_rate"]
+    pcm_chunks = []
+    with av.open(path) as container:
+        if not container.streams.audio:
+            return b""
+        audio_stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=audio_rate)
+        for packet in container.demux(audio_stream):
+            for frame in packet.decode():
+                pcm_chunks.append(_resample_to_pcm(resampler, frame))
+        pcm_chunks.append(_resample_to_pcm(resampler, None))
+    return b"".join(pcm_chunks)
+
+
+def decode_sampled_frames(path: str, num_frames: int, max_long_side: int) -> Optional[SharedFrames]:
+    """
+    只解复用视频流，按时间均匀保留 num_frames 帧并写入共享内存，取满后即停止解码。
+    可在视频处理进程池中执行，返回值只包含共享内存句柄，传回主进程的开销很小。
+    :return: SharedFrames，视频流不存在或没有解出帧时返回 None
+    """
+    import av
+    import numpy as np
+    from multiprocessing import shared_memory
+    from tools.common.image import resize_long_side
+
+    frames = []
+    with av.open(path) as container:
+        if not container.streams.video:
+            return None
+        video_stream = container.streams.video[0]
+        duration_s = container.duration / av.time_base if container.duration else None
+        if video_stream.duration:
+            duration_s = float(video_stream.duration * video_stream.time_base)
+        interval_s = duration_s / num_frames if duration_s else MEDIA_BUNDLE["fallback_interval_s"]
+
+        next_frame_s = None
+        for packet in container.demux(video_stream):
+            for frame in packet.decode():
+                if frame.time is not None and next_frame_s is not None and frame.time < next_frame_s:
+                    continue
+                frames.append(resize_long_side(frame.to_ndarray(format="bgr24"), max_long_side))
+                next_frame_s = (frame.time or 0.0) + interval_s
+                if len(frames) >= num_frames:
+                    break
+            if len(frames) >= num_frames:
+                break
+
+    if not frames:
+        return None
+    # 同一视频的帧尺寸一致，直接堆叠写入共享内存
+    stacked = np.stack(frames)
+    shm = shared_memory.SharedMemory(create=True, size=stacked.nbytes)
+    np.ndarray(stacked.shape, dtype=stacked.dtype, buffer=shm.buf)[:] = stacked
+    shared = SharedFrames(name=shm.name, shape=stacked.shape, dtype=str(stacked.dtype))
+    shm.close()
+    return shared
+
+
+class MediaBundle:
+    """
+    单次上传视频的媒体资源包。各项资源均为懒加载且相互独立：音频只解码音频流，
+    采样帧在首次读取 frames 时才在视频处理进程池中解码，只用到语音识别的轮次不解码视频。
+    通过 open_media_bundle 创建并登记，close 时释放内存与共享内存。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._encoded: Optional[bytes] = None
+        self._data_url: Optional[str] = None
+        self._content_hash: Optional[str] = None
+        self._loaded: Dict[str, object] = {}
+        self._loading: Dict[str, Future] = {}
+        self._prefetched: Dict[str, Future] = {}
+        self._prefetch_cleanups: Dict[str, Callable] = {}
+        self._closed = False
+
+    @property
+    def encoded_bytes(self) -> memoryview:
+        """上传视频的原始编码字节（只读取一次）"""
+        with self._lock:
+            if self._encoded is None:
+                with open(self.path, "rb") as f:
+                    self._encoded = f.read()
+            return memoryview(self._encoded)
+
+    @property
+    def mime_type(self) -> str:
+        mime_type, _ = mimetypes.guess_type(self.path)
+        return mime_type or "video/mp4"
+
+    @property
+    def data_url(self) -> str:
+        """base64 data URL 形式的视频（只编码一次），供多模态大模型使用"""
+        encoded = self.encoded_bytes
+        with self._lock:
+            if self._data_url is None:
+                self._data_url = f"data:{self.mime_type};base64,{base64.b64encode(encoded).decode('utf-8')}"
+            return self._data_url
+
+    @property
+    def content_hash(self) -> str:
+        """视频内容哈希，与 utils.face_cache.video_content_hash 结果一致"""
+        encoded = self.encoded_bytes
+        with self._lock:
+            if self._content_hash is None:
+                self._content_hash = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+            return self._content_hash
+
+    def _load_once(self, name: str, loader: Callable, discard: Optional[Callable] = None):
+        """
+        首次调用时执行 loader 并缓存结果，并发调用方等待同一次加载。
+        加载期间不持有 self._lock，data_url、pop_prefetched、close 等不会被阻塞。
+        :param discard: 加载期间资源包已被释放时，用于释放刚加载出的结果
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"MediaBundle 已释放: {self.path}")
+            if name in self._loaded:
+                return self._loaded[name]
+            future = self._loading.get(name)
+            owner = future is None
+            if owner:
+                future = self._loading[name] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                # 加载失败时允许下次重试
+                self._loading.pop(name, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._loading.pop(name, None)
+            closed = self._closed
+            if not closed:
+                self._loaded[name] = value
+        if closed:
+            if discard is not None:
+                discard(value)
+            error = RuntimeError(f"MediaBundle 已释放: {self.path}")
+            future.set_exception(error)
+            raise error
+        future.set_result(value)
+        return value
+
+    def _decode_audio(self) -> bytes:
+        pcm = decode_audio_pcm(self.path, MEDIA_BUNDLE["audio_sample_rate"])
+        MiraLog("app", f"[MediaBundle] 音频解码完成: {self.path}, {len(pcm)} 字节")
+        return pcm
+
+    def _decode_frames(self) -> Optional[SharedFrames]:
+        from utils.video_pool import run_in_video_pool
+
+        content_hash = self.content_hash
+        frames = run_in_video_pool(
+            decode_sampled_frames, self.path, MEDIA_BUNDLE["num_frames"], MEDIA_BUNDLE["max_long_side"]
+        )
+        if frames is not None:
+            frames = SharedFrames(frames.name, frames.shape, frames.dtype, content_hash)
+        MiraLog("app", f"[MediaBundle] 采样帧解码完成: {self.path}, {frames.shape if frames else None}")
+        return frames
+
+    @property
+    def audio_pcm(self) -> bytes:
+        """单声道 16bit PCM 音频（只解码音频流）"""
+        return self._load_once("audio_pcm", self._decode_audio)
+
+    @property
+    def sample_rate(self) -> int:
+        return MEDIA_BUNDLE["audio_sample_rate"]
+
+    @property
+    def frames(self) -> Optional[SharedFrames]:
+        """按时间均匀采样的视频帧（共享内存句柄），首次读取时解码，视频流不存在时为 None"""
+        return self._load_once("frames", self._decode_frames, discard=_unlink_frames)
+
+    def prefetch(self, key: str, fn, *args, cleanup: Optional[Callable] = None, **kwargs) -> Future:
+        """
+        在后台线程中提前执行 fn，结果按 key 保存，供后续环节通过 pop_prefetched 取用。
+        :param cleanup: 结果直到 close 仍未被取用时，对结果调用 cleanup 释放其占用的资源（如临时文件）
+        """
+        future = _prefetch_executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._prefetched[key] = future
+            if cleanup is not None:
+                self._prefetch_cleanups[key] = cleanup
+        return future
+
+    def pop_prefetched(self, key: str) -> Optional[Future]:
+        """取出预取任务的 Future（只能取用一次），取出后结果由调用方负责，不存在时返回 None"""
+        with self._lock:
+            self._prefetch_cleanups.pop(key, None)
+            return self._prefetched.pop(key, None)
+
+    def close(self):
+        """释放所有资源，包括共享内存中的采样帧"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            frames = self._loaded.get("frames")
+            self._encoded = self._data_url = None
+            self._loaded = {}
+            prefetched, cleanups = self._prefetched, self._prefetch_cleanups
+            self._prefetched, self._prefetch_cleanups = {}, {}
+        # 未被取用的预取任务：尚未开始的直接取消；进行中的不等待，完成后释放其结果，
+        # 共享内存中的采样帧等这些任务全部结束后再释放，避免任务仍在读取时被释放
+        running = []
+        for key, future in prefetched.items():
+            if future.cancel():
+                continue
+            running.append(future)
+            cleanup = cleanups.get(key)
+            if cleanup is not None:
+                future.add_done_callback(lambda f, key=key, cleanup=cleanup: _cleanup_prefetched(key, f, cleanup))
+        _unlink_frames_after(running, frames)
+        with _registry_lock:
+            if _registry.get(self.path) is self:
+                del _registry[self.path]
+        MiraLog("app", f"[MediaBundle] 已释放: {self.path}")
+
+
+def _unlink_frames(frames: Optional[SharedFrames]):
+    """释放采样帧所在的共享内存"""
+    if frames is None:
+        return
+    from multiprocessing import shared_memory
+    try:
+        shm = shared_memory.SharedMemory(name=frames.name)
+        shm.close()
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _unlink_frames_after(futures, frames: Optional[SharedFrames]):
+    """等 futures 全部结束后再释放采样帧的共享内存，futures 为空时立即释放"""
+    if frames is None or not futures:
+        _unlink_frames(frames)
+        return
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def _done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            _unlink_frames(frames)
+
+    for future in futures:
+        future.add_done_callback(_done)
+
+
+def _cleanup_prefetched(key: str, future: Future, cleanup: Callable):
+    """释放未被取用的预取结果"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        cleanup(future.result())
+    except Exception as e:
+        MiraLog("app", f"[MediaBundle] 释放未使用的预取结果 {key} 失败: {e}", "WARNING")
+
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=MEDIA_BUNDLE["prefetch_workers"], thread_name_prefix="media-prefetch")
+
+_registry_lock = threading.Lock()
+_registry: Dict[str, MediaBundle] = {}
+
+
+def open_media_bundle(path: str) -> MediaBundle:
+    """为上传视频创建并登记 MediaBundle，同一路径已存在时直接返回"""
+    with _registry_lock:
+        bundle = _registry.get(path)
+        if bundle is None:
+            bundle = MediaBundle(path)
+            _registry[path] = bundle
+        return bundle
+
+
+def get_media_bundle(path) -> Optional[MediaBundle]:
+    """按视频路径查找本轮已登记的 MediaBundle，未登记时返回 None"""
+    if not isinstance(path, str):
+        return None
+    with _registry_lock:
+        return _registry.get(path)
@@ -1,34 +1,28 @@
-from moviepy.video.io.VideoFileClip import VideoFileClip
-import tempfile
 import speech_recognition as sr
 import os
+from config import MEDIA_BUNDLE
+from tools.common.media import get_media_bundle, decode_audio_pcm
+from utils.asr import transcribe_pcm
 
-def video_to_audio(video_path):
-    # 用临时文件保存音频
-    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_audio:
-        audio_path = tmp_audio.name
-    clip = VideoFileClip(video_path)
-    clip.audio.write_audiofile(audio_path, logger=None)
-    return audio_path
+def video_to_audio(video_path) -> sr.AudioData:
+    """
+    提取视频中的音频。
+    :return: sr.AudioData（16kHz 单声道 16bit PCM，保存在内存中，不再返回临时文件路径）
+    """
+    # 进程内解复用并重采样，不落盘
+    sample_rate = MEDIA_BUNDLE["audio_sample_rate"]
+    return sr.AudioData(decode_audio_pcm(video_path, sample_rate), sample_rate, 2)
 
-def audio_to_text(audio_path):
-    recognizer = sr.Recognizer()
-    with sr.AudioFile(audio_path) as source:
-        audio = recognizer.record(source)
-    try:
-        text = recognizer.recognize_google(audio, language="zh-CN")
-    except Exception:
-        text = ""
-    return text
+def audio_to_text(audio: sr.AudioData) -> str:
+    # 由 ASR 配置选择识别后端，失败时记录日志并返回空字符串
+    return transcribe_pcm(audio.frame_data, audio.sample_rate)
 
 def video_to_text(video_path):
-    audio_path = video_to_audio(video_path)
-    try:
-        text = audio_to_text(audio_path)
-    finally:
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-    return text
+    # 本轮已登记 MediaBundle 时直接使用其解码好的 PCM，不再单独提取音频
+    bundle = get_media_bundle(video_path)
+    if bundle:
+        return audio_to_text(sr.AudioData(bundle.audio_pcm, bundle.sample_rate, 2))
+    return audio_to_text(video_to_audio(video_path))
 
 def fill_config_with_env(config: dict) -> dict:
     key_env_map = {
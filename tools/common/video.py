@@ -0,0 +1,207 @@
+"""
+视频输入的通用处理：统一视频来源、逐帧解码与采样、帧质量评估等。
+"""
+import base64
+import io
+import os
+from typing import Union
+
+from config import FRAME_PREFILTER, FRAME_SAMPLING, FACE_FRAME_SELECTION
+from utils.loggers import MiraLog
+
+VideoInput = Union[str, bytes, bytearray, memoryview, io.BytesIO]
+
+
+def to_video_source(video: VideoInput):
+    """
+    将各种形式的视频输入转换为 av.open 可直接打开的来源，避免 base64 与临时文件的往返拷贝。
+    支持：文件路径、bytes/bytearray/memoryview、io.BytesIO，以及兼容旧逻辑的 base64 / data URL 字符串。
+    :return: 文件路径(str) 或 io.BytesIO；无法识别时返回 None
+    """
+    if video is None:
+        return None
+    if isinstance(video, io.BytesIO):
+        video.seek(0)
+        return video
+    if isinstance(video, (bytes, bytearray, memoryview)):
+        # bytes 会被 BytesIO 共享而非拷贝，直到缓冲区被修改
+        return io.BytesIO(video)
+    if isinstance(video, str):
+        if os.path.exists(video):
+            return video
+        # 兼容 base64 / data URL 形式的输入
+        try:
+            if ',' in video:
+                video = video.split(',', 1)[1]
+            missing_padding = len(video) % 4
+            if missing_padding:
+                video += '=' * (4 - missing_padding)
+            return io.BytesIO(base64.b64decode(video))
+        except Exception as e:
+            MiraLog("skin_analysis", f"[to_video_source] base64解码失败: {e}", "ERROR")
+            return None
+    MiraLog("skin_analysis", f"[to_video_source] 不支持的视频输入类型: {type(video)}", "ERROR")
+    return None
+
+
+def describe_video_input(video: VideoInput) -> str:
+    """用于日志的视频输入描述"""
+    if hasattr(video, "shape"):
+        return f"已解码的采样帧 {tuple(video.shape)}"
+    if isinstance(video, str) and os.path.exists(video):
+        return f"文件 {video}（{os.path.getsize(video)} 字节）"
+    if isinstance(video, io.BytesIO):
+        return f"内存缓冲区（{video.getbuffer().nbytes} 字节）"
+    if isinstance(video, (bytes, bytearray, memoryview)):
+        return f"内存缓冲区（{len(video)} 字节）"
+    return f"base64 字符串（长度 {len(video) if video else 0}）"
+
+
+def iter_keyframes(container, max_frames):
+    """
+    逐个解码视频关键帧（I帧）的生成器，解码一帧产出一帧，不在内存中累积帧。
+    :param container: av.open 打开的容器
+    :param max_frames: 最多产出的帧数
+    :return: BGR 格式的 ndarray 生成器
+    """
+    count = 0
+    for frame in container.decode(video=0):
+        if not frame.key_frame:
+            continue
+        yield frame.to_ndarray(format='bgr24')
+        count += 1
+        if count >= max_frames:
+            break
+
+
+def iter_sampled_frames(container, num_samples: int, time_budget_s: float = None):
+    """
+    按时间均匀采样：在视频时长内均匀选取 num_samples 个时间点，seek 到目标时间点前的关键帧后
+    只解码到目标时间点，解码量与采样数成正比，而不是与视频长度成正比。
+    相邻目标点距离较近时直接继续向后解码，避免关键帧稀疏时重复 seek 回同一关键帧。
+    无法获取时长时（如部分浏览器录制的 webm）退化为按固定时间间隔顺序采样。
+    :param container: av.open 打开的容器
+    :param num_samples: 采样帧数上限
+    :param time_budget_s: 采样的墙钟时间预算（秒），超出即停止
+    :return: BGR 格式的 ndarray 生成器
+    """
+    import av
+    import time
+
+    stream = container.streams.video[0]
+    stream.thread_type = "AUTO"
+    start_time = time.time()
+    time_base = float(stream.time_base)
+    start_s = float(stream.start_time * stream.time_base) if stream.start_time is not None else 0.0
+    if stream.duration:
+        duration_s = float(stream.duration * stream.time_base)
+    elif container.duration:
+        duration_s = container.duration / av.time_base
+    else:
+        duration_s = None
+
+    if not duration_s:
+        MiraLog("skin_analysis", "[iter_sampled_frames] 无法获取视频时长，按固定时间间隔顺序采样")
+        yield from _iter_interval_frames(container, stream, num_samples, time_budget_s, start_time)
+        return
+
+    seek_threshold_s = FRAME_SAMPLING["seek_threshold_s"]
+    decoder = None
+    last_s = None
+    for i in range(num_samples):
+        if time_budget_s and time.time() - start_time > time_budget_s:
+            MiraLog("skin_analysis", f"[iter_sampled_frames] 超出采样时间预算 {time_budget_s}s，已采样 {i} 帧", "WARNING")
+            return
+        target_s = start_s + duration_s * (i + 0.5) / num_samples
+        if decoder is None or last_s is None or target_s - last_s > seek_threshold_s:
+            container.seek(int(target_s / time_base), stream=stream, backward=True, any_frame=False)
+            decoder = container.decode(stream)
+        for frame in decoder:
+            if frame.time is None or frame.time >= target_s:
+                last_s = frame.time
+                yield frame.to_ndarray(format='bgr24')
+                break
+        else:
+            # 已解码到视频末尾
+            return
+
+
+def _iter_interval_frames(container, stream, num_samples, time_budget_s, start_time):
+    """顺序解码，每隔固定时间间隔取一帧（只对被选中的帧做像素格式转换）"""
+    import time
+
+    interval_s = FRAME_SAMPLING["fallback_interval_s"]
+    next_s = None
+    count = 0
+    for frame in container.decode(stream):
+        if time_budget_s and time.time() - start_time > time_budget_s:
+            MiraLog("skin_analysis", f"[iter_sampled_frames] 超出采样时间预算 {time_budget_s}s，已采样 {count} 帧", "WARNING")
+            return
+        if frame.time is not None and next_s is not None and frame.time < next_s:
+            continue
+        yield frame.to_ndarray(format='bgr24')
+        count += 1
+        if count >= num_samples:
+            return
+        next_s = (frame.time or 0.0) + interval_s
+
+
+def iter_video_frames(container):
+    """按配置选择采样方式：seek 为按时间均匀 seek 采样，keyframe 为顺序解码关键帧"""
+    if FRAME_SAMPLING["sampler"] == "seek":
+        return iter_sampled_frames(container, FRAME_SAMPLING["num_samples"], FRAME_SAMPLING["time_budget_s"])
+    return iter_keyframes(container, FACE_FRAME_SELECTION["max_frames"])
+
+
+def frame_quality_scores(frames, thumb_width: int = None):
+    """
+    在缩略图上一次性向量化计算整批帧的质量分，用于在人脸检测前筛掉模糊、曝光差、运动大的帧。
+    - 清晰度：拉普拉斯方差
+    - 曝光：亮度均值偏离中间调的程度与直方图两端（过曝/欠曝）像素占比
+    - 运动：与前一帧缩略图的平均绝对差
+    :param frames: 同尺寸 BGR ndarray 列表
+    :return: 与 frames 一一对应的质量分 ndarray（越大越好，范围约 0~1）
+    """
+    import cv2
+    import numpy as np
+
+    thumb_width = thumb_width or FRAME_PREFILTER["thumb_width"]
+    h, w = frames[0].shape[:2]
+    thumb_size = (thumb_width, max(int(h * thumb_width / w), 3))
+    thumbs = np.stack([
+        cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), thumb_size, interpolation=cv2.INTER_AREA)
+        for frame in frames
+    ]).astype(np.float32)
+    n = len(frames)
+    flat = thumbs.reshape(n, -1)
+
+    # 清晰度：4 邻域拉普拉斯的方差，对整批同时计算
+    lap = (thumbs[:, :-2, 1:-1] + thumbs[:, 2:, 1:-1] + thumbs[:, 1:-1, :-2] + thumbs[:, 1:-1, 2:]
+           - 4 * thumbs[:, 1:-1, 1:-1])
+    sharpness = lap.reshape(n, -1).var(axis=1)
+    sharpness = sharpness / (sharpness.max() + 1e-6)
+
+    # 曝光
+    clipped = ((flat < 16) | (flat > 239)).mean(axis=1)
+    exposure = (1 - np.abs(flat.mean(axis=1) - 128) / 128) * (1 - clipped)
+
+    # 运动
+    motion = np.zeros(n, dtype=np.float32)
+    if n > 1:
+        motion[1:] = np.abs(np.diff(flat, axis=0)).mean(axis=1) / 255
+    motion_penalty = 1 - np.clip(motion * FRAME_PREFILTER["motion_weight"], 0, 1)
+
+    return sharpness * exposure * motion_penalty
+
+
+def select_top_frames(frames, top_k: int):
+    """
+    按质量分选出前 top_k 帧，保持原有先后顺序。
+    :return: 被选中帧在 frames 中的下标列表
+    """
+    import numpy as np
+
+    if len(frames) <= top_k:
+        return list(range(len(frames)))
+    scores = frame_quality_scores(frames)
+    return sorted(np.argsort(scores)[::-1][:top_k].tolist())
@@ -0,0 +1,196 @@
+"""
+新意图识别的分级路由：
+1. 关键词正则：预编译，只有一个意图命中时直接采用
+2. 本地分类器：字符 n-gram 朴素贝叶斯，用种子样例与历史上大模型判定的意图训练，后验概率达到阈值时采用
+3. 大模型：前两级都无法确定时调用，判定结果写入记录并增量训练分类器
+各级的命中次数与耗时可通过 get_intent_router_metrics 查看。
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import INTENT_ROUTER
+from utils.loggers import MiraLog
+
+TIERS = ("regex", "classifier", "llm")
+
+_PATTERNS: Dict[str, List[re.Pattern]] = {
+    intent: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for intent, patterns in INTENT_ROUTER["patterns"].items()
+}
+
+
+_VIDEO_SPEECH_TAG = re.compile(r"</?视频中说话内容>")
+
+
+def normalize_text(text: str) -> str:
+    """去掉视频语音识别结果的包裹标签，只保留用户说的内容"""
+    return _VIDEO_SPEECH_TAG.sub(" ", text).strip()
+
+
+def match_patterns(text: str) -> Optional[str]:
+    """关键词正则匹配，恰好一个意图命中时返回该意图，否则返回 None"""
+    matched = {intent for intent, patterns in _PATTERNS.items() if any(p.search(text) for p in patterns)}
+    return matched.pop() if len(matched) == 1 else None
+
+
+class NGramNaiveBayes:
+    """字符 n-gram 多项式朴素贝叶斯，支持增量训练"""
+
+    def __init__(self, ngram_range: Tuple[int, int] = (1, 3), alpha: float = 0.5):
+        self.ngram_range = ngram_range
+        self.alpha = alpha
+        self._class_docs: Counter = Counter()
+        self._class_grams: Dict[str, Counter] = defaultdict(Counter)
+        self._class_totals: Counter = Counter()
+        self._vocab = set()
+
+    @property
+    def num_examples(self) -> int:
+        return sum(self._class_docs.values())
+
+    def _ngrams(self, text: str) -> List[str]:
+        text = re.sub(r"\s+", "", text.lower())
+        low, high = self.ngram_range
+        return [text[i:i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1)]
+
+    def learn(self, text: str, label: str):
+        grams = self._ngrams(text)
+        if not grams:
+            return
+        self._class_docs[label] += 1
+        self._class_grams[label].update(grams)
+        self._class_totals[label] += len(grams)
+        self._vocab.update(grams)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """返回 (最可能的意图, 后验概率)，没有可用特征时返回 (None, 0.0)"""
+        grams = self._ngrams(text)
+        if not grams or not self._class_docs:
+            return None, 0.0
+        total_docs = self.num_examples
+        vocab_size = len(self._vocab)
+        scores = {}
+        for label, docs in self._class_docs.items():
+            counts = self._class_grams[label]
+            denominator = self._class_totals[label] + self.alpha * vocab_size
+            scores[label] = math.log(docs / total_docs) + sum(
+                math.log((counts[g] + self.alpha) / denominator) for g in grams
+            )
+        best = max(scores, key=scores.get)
+        # 对数似然做 softmax 得到后验概率
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / normalizer
+
+
+_lock = threading.Lock()
+_classifier: Optional[NGramNaiveBayes] = None
+_metrics = {tier: {"hits": 0, "total_latency_s": 0.0} for tier in TIERS}
+
+
+def _load_classifier() -> NGramNaiveBayes:
+    """用种子样例和意图记录训练分类器，调用方需持有 _lock"""
+    global _classifier
+    if _classifier is None:
+        options = INTENT_ROUTER["classifier"]
+        classifier = NGramNaiveBayes(tuple(options["ngram_range"]), options["alpha"])
+        for intent, examples in INTENT_ROUTER["seed_examples"].items():
+            for example in examples:
+                classifier.learn(example, intent)
+        log_path = INTENT_ROUTER["log_path"]
+        if os.path.exists(log_path):
+            try:
+                with open(log_path, "r", encoding="utf-8") as f:
+                    lines = f.readlines()[-INTENT_ROUTER["max_log_examples"]:]
+                for line in lines:
+                    record = json.loads(line)
+                    text = normalize_text(record["text"])
+                    if len(text) <= INTENT_ROUTER["max_text_chars"]:
+                        classifier.learn(text, record["intent"])
+            except Exception as e:
+                MiraLog("mira_graph", f"[intent_router] 意图记录加载失败: {e}", "WARNING")
+        _classifier = classifier
+        MiraLog("mira_graph", f"[intent_router] 分类器训练完成，样本数 {classifier.num_examples}")
+    return _classifier
+
+
+def _record_llm_intent(text: str, intent: str):
+    """记录大模型判定的意图并增量训练分类器，调用方需持有 _lock"""
+    _load_classifier().learn(text, intent)
+    try:
+        os.makedirs(os.path.dirname(INTENT_ROUTER["log_path"]) or ".", exist_ok=True)
+        with open(INTENT_ROUTER["log_path"], "a", encoding="utf-8") as f:
+            f.write(json.dumps({"text": text, "intent": intent, "ts": time.time()}, ensure_ascii=False) + "\n")
+    except OSError as e:
+        MiraLog("mira_graph", f"[intent_router] 意图记录写入失败: {e}", "WARNING")
+
+
+def _hit(tier: str, start_time: float, intent: str, detail: str = ""):
+    latency_s = time.perf_counter() - start_time
+    with _lock:
+        _metrics[tier]["hits"] += 1
+        _metrics[tier]["total_latency_s"] += latency_s
+    MiraLog("mira_graph", f"[intent_router] {tier} 命中: {intent}{detail}，耗时 {latency_s * 1000:.1f}ms")
+
+
+def fast_route(text: str) -> Optional[str]:
+    """只尝试本地的两级（正则、分类器），无法确定时返回 None"""
+    start_time = time.perf_counter()
+    text = normalize_text(text)
+    if not text:
+        return None
+    intent = match_patterns(text)
+    if intent is not None:
+        _hit("regex", start_time, intent)
+        return intent
+
+    options = INTENT_ROUTER["classifier"]
+    with _lock:
+        classifier = _load_classifier()
+        if classifier.num_examples >= options["min_examples"]:
+            intent, confidence = classifier.predict(text)
+        else:
+            intent, confidence = None, 0.0
+    if intent is not None and confidence >= options["min_confidence"]:
+        _hit("classifier", start_time, intent, f"（置信度 {confidence:.3f}）")
+        return intent
+    return None
+
+
+def record_llm_route(text: str, intent: str, start_time: float):
+    """记录一次由大模型判定的意图：计入 llm 级指标，写入意图记录并训练分类器"""
+    _hit("llm", start_time, intent)
+    text = normalize_text(text)
+    if text and len(text) <= INTENT_ROUTER["max_text_chars"]:
+        with _lock:
+            _record_llm_intent(text, intent)
+
+
+def route_intent(text: str, llm_fallback: Callable[[], str]) -> str:
+    """
+    分级识别新意图。
+    :param text: 用户本轮输入的文本
+    :param llm_fallback: 前两级无法确定时调用，返回大模型判定的意图
+    """
+    start_time = time.perf_counter()
+    intent = fast_route(text)
+    if intent is None:
+        intent = llm_fallback()
+        record_llm_route(text, intent, start_time)
+    return intent
+
+
+def get_intent_router_metrics() -> dict:
+    """返回各级的命中次数、命中率与平均耗时"""
+    with _lock:
+        metrics = {tier: dict(m) for tier, m in _metrics.items()}
+    total = sum(m["hits"] for m in metrics.values())
+    for m in metrics.values():
+        m["hit_rate"] = m["hits"] / total if total else 0.0
+        m["avg_latency_s"] = m["total_latency_s"] / m["hits"] if m["hits"] else 0.0
+    return metrics
@@ -1,5 +1,10 @@
-from langchain_openai import ChatOpenAI
+from utils.llm import get_chat_model
+import re
+import time
+
 from langchain.schema import HumanMessage, SystemMessage
+from config import INTENT_ROUTER
+from tools.intent_router import fast_route, record_llm_route, route_intent
 
 # 意图类别列表
 INTENT_CATEGORIES = [
@@ -52,12 +57,7 @@ def multimodal_chat_agent(messages, config, streaming=False):
     character_setting = config.get("character_setting", {})
     # 如果是第一次对话，添加系统提示词
     system_prompt = SystemMessage(content=generate_system_prompt(character_setting))
-    llm = ChatOpenAI(
-        openai_api_key=config.get("chat_api_key"),
-        openai_api_base=config.get("chat_api_base"),
-        model=config.get("chat_model_name"),
-        streaming=streaming
-    )
+    llm = get_chat_model(config, streaming=streaming)
     messages = [system_prompt] + messages
     if streaming:
         # 返回生成器，流式输出
@@ -85,8 +85,7 @@ def recognize_intent(state: dict, config: dict) -> str:
         str: 如果 state 中没有 current_flow，返回识别出的新意图类别；
              如果 state 中有 current_flow，返回新的意图类别或"继续"
     """
-    current_content = state["messages"][-1].content
-    text = [item["text"] for item in current_content if item["type"] == "text"]
+    text = _current_text(state)
     current_flow = state.get("current_flow")
     
     # 获取上一轮对话内容（如果存在）
@@ -168,25 +167,115 @@ def recognize_intent(state: dict, config: dict) -> str:
 - 如果应该继续当前流程，直接返回"继续"
 """
 
-    llm = ChatOpenAI(
-        openai_api_key=config['configurable'].get("chat_api_key"),
-        openai_api_base=config['configurable'].get("chat_api_base"),
-        model=config['configurable'].get("chat_model_name")
-    )
-    result = llm.invoke([HumanMessage(content=prompt)])
-    intent = result.content.strip()
-    
+    def llm_intent():
+        llm = get_chat_model(config['configurable'])
+        result = llm.invoke([HumanMessage(content=prompt)])
+        return result.content.strip()
+
     if current_flow is None:
-        # 新意图识别模式：确保返回有效的意图类别
-        for cat in INTENT_CATEGORIES:
-            if cat in intent:
-                return cat
-        return "聊天互动"
+        # 新意图识别模式：先走本地快速路由，无法确定时再调用大模型，确保返回有效的意图类别
+        def llm_category():
+            intent = llm_intent()
+            for cat in INTENT_CATEGORIES:
+                if cat in intent:
+                    return cat
+            return "聊天互动"
+
+        if INTENT_ROUTER["enabled"]:
+            return route_intent(text, llm_category)
+        return llm_category()
     else:
+        intent = llm_intent()
         # 意图切换判断模式：如果是新意图则返回新意图，否则返回"继续"
         if intent in INTENT_CATEGORIES:
             return intent
         return current_flow
 
 
+def _current_text(state: dict) -> str:
+    """用户本轮输入中的文本部分"""
+    current_content = state["messages"][-1].content
+    if isinstance(current_content, str):
+        return current_content
+    return " ".join(item["text"] for item in current_content if item["type"] == "text")
 
+
+_ROUTE_TOKEN = re.compile(r"^\s*<route>(.*?)</route>\s*", re.DOTALL)
+
+FUSED_ROUTING_PROMPT = f"""
+
+在回复之前，你需要先判断用户本轮输入的意图，可选类别：{INTENT_CATEGORIES}
+- 明确要求肤质检测、创建或修改个人档案、产品推荐/识别/成分分析、化妆或护肤教学的，归为对应类别
+- 问候、闲聊、情感交流及其他无法确定具体功能的内容，归为"聊天互动"
+
+输出格式要求：
+- 第一行必须是路由标记，如 <route>聊天互动</route>
+- 如果类别是"聊天互动"，在标记之后直接输出给用户的回复
+- 如果是其他类别，只输出路由标记，不要输出任何其他内容"""
+
+
+def _fused_chat_stream(messages, config):
+    """
+    一次流式调用同时完成意图识别与闲聊回复。
+    :return: (意图类别, 回复文本生成器)；意图不是聊天互动时已中止生成，生成器为 None
+    """
+    character_setting = config.get("character_setting", {})
+    system_prompt = SystemMessage(content=generate_system_prompt(character_setting) + FUSED_ROUTING_PROMPT)
+    llm = get_chat_model(config, streaming=True)
+    stream = llm.stream([system_prompt] + messages)
+
+    buffer = ""
+    match = None
+    for chunk in stream:
+        if hasattr(chunk, 'content') and chunk.content:
+            buffer += chunk.content
+            match = _ROUTE_TOKEN.match(buffer)
+            if match or len(buffer) > INTENT_ROUTER["fused_chat"]["max_route_chars"]:
+                break
+
+    intent = "聊天互动"
+    # 未按格式输出路由标记时按闲聊处理，去掉残缺的标记后把已生成内容作为回复开头
+    reply_head = buffer.replace("<route>", "").replace("</route>", "").lstrip()
+    if match:
+        reply_head = buffer[match.end():]
+        for cat in INTENT_CATEGORIES:
+            if cat in match.group(1):
+                intent = cat
+                break
+    if intent != "聊天互动":
+        # 关闭生成器即断开流式连接，不再为用不到的内容付费
+        stream.close()
+        return intent, None
+
+    def reply_gen():
+        try:
+            if reply_head:
+                yield reply_head
+            for chunk in stream:
+                if hasattr(chunk, 'content') and chunk.content:
+                    yield chunk.content
+        finally:
+            stream.close()
+    return intent, reply_gen()
+
+
+def is_greeting_turn(state: dict, config: dict) -> bool:
+    """本轮输入是否为新建对话时自动发送的欢迎语提示词（不是用户输入，不参与意图识别）"""
+    greeting_prompt = (config['configurable'].get("greeting_prompt") or "").strip()
+    return bool(greeting_prompt) and _current_text(state).strip() == greeting_prompt
+
+
+def route_and_reply(state: dict, config: dict):
+    """
+    新意图识别（无进行中流程时）：本地路由能确定时直接返回；否则用一次流式调用同时完成意图识别与闲聊回复。
+    :return: (意图类别, 回复文本生成器或 None)；生成器为 None 时如需闲聊回复，由调用方另行调用 multimodal_chat_agent
+    """
+    text = _current_text(state)
+    if INTENT_ROUTER["enabled"]:
+        intent = fast_route(text)
+        if intent is not None:
+            return intent, None
+    start_time = time.perf_counter()
+    intent, reply = _fused_chat_stream(state["messages"], config['configurable'])
+    record_llm_route(text, intent, start_time)
+    return intent, reply
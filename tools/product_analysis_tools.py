@@ -1,4 +1,4 @@
-from langchain_openai import ChatOpenAI
+from utils.llm import get_chat_model
 from langchain_core.messages import HumanMessage
 
 
@@ -57,11 +57,6 @@ def extract_structured_info_from_search(messages: list, config) -> dict:
         f"```{history_text}```"
     )
     messages = [HumanMessage(content=prompt)]
-    llm = ChatOpenAI(
-        model=config['configurable'].get("chat_model_name"),
-        openai_api_base=config['configurable'].get("chat_api_base"),
-        openai_api_key=config['configurable'].get("chat_api_key"),
-        streaming=False
-    ).with_structured_output(method="json_mode")
+    llm = get_chat_model(config['configurable'], output="json")
     response = llm.invoke(messages)
     return response
\ No newline at end of file
@@ -1,22 +1,28 @@
 import logging
 import av
-import insightface
 import numpy as np
 import tempfile
 import cv2
 import os
 import requests
 import json
-from langchain_openai import ChatOpenAI
+from utils.llm import get_chat_model
 from langchain.schema import SystemMessage, HumanMessage
 from utils.loggers import MiraLog
 import base64
 import io
 import tempfile
 import time
+from contextlib import nullcontext
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from tools.common.formatters import format_user_info
+from utils.face_engine import get_face_engine, detect_faces_batch, refine_face
+from utils.face_cache import video_content_hash, get_cached_face, put_cached_face
+from tools.common.image import prepare_face_image
+from tools.common.video import to_video_source, describe_video_input, iter_video_frames, select_top_frames
+from tools.common.media import SharedFrames
+from config import FACE_FRAME_SELECTION, FACE_DETECTION, FRAME_PREFILTER
 
 def get_access_token(config):
     """
@@ -275,115 +281,152 @@ def poll_skin_analysis_task(task_id, access_token, max_retries=30):
     
     raise RuntimeError(f"轮询超时，任务可能仍在处理中")
 
-def extract_best_face_frame(video_base64):
+def extract_best_face(video):
     """
-    从base64编码的视频中采样关键帧，做人脸检测，选取最佳帧，返回最佳帧的临时文件路径。
-    :param video_base64: base64编码的视频数据
-    :return: 最佳帧图片的临时文件路径(str)，无有效帧时返回 None
+    从视频中采样视频帧，做人脸检测，选取最佳帧。相同内容的视频直接返回缓存结果，不再解码与检测。
+    :param video: 视频文件路径、内存缓冲区（bytes/memoryview/io.BytesIO）、MediaBundle 已解码的采样帧（SharedFrames），
+                  或兼容旧逻辑的 base64 字符串
+    :return: dict，包含 path（最佳帧图片临时文件路径）、score、kps_count、bbox、kps、pose；无有效帧时返回 None
     """
-    MiraLog("skin_analysis", f"[extract_best_face_frame] 接收到base64视频数据，长度: {len(video_base64) if video_base64 else 0}")
-    
-    if not video_base64:
-        MiraLog("skin_analysis", "[extract_best_face_frame] base64视频数据为空", "WARNING")
-        return None
-    
-    # 将base64数据解码为二进制
-    try:
-        # 去除可能的base64前缀
-        if ',' in video_base64:
-            video_base64 = video_base64.split(',', 1)[1]
-        
-        # 处理base64填充问题
-        missing_padding = len(video_base64) % 4
-        if missing_padding:
-            video_base64 += '=' * (4 - missing_padding)
-        
-        video_data = base64.b64decode(video_base64)
-    except Exception as e:
-        MiraLog("skin_analysis", f"[extract_best_face_frame] base64解码失败: {e}", "ERROR")
+    if not video:
+        MiraLog("skin_analysis", "[extract_best_face] 视频数据为空", "WARNING")
         return None
+    MiraLog("skin_analysis", f"[extract_best_face] 接收到视频输入: {describe_video_input(video)}")
+    
+    # MediaBundle 已解码的采样帧直接从共享内存读取，不再重复解码
+    shared_frames = video if isinstance(video, SharedFrames) else None
+    cache_key = shared_frames.content_hash if shared_frames else video_content_hash(video)
+    cached = get_cached_face(cache_key)
+    if cached:
+        return cached
+    
+    # 直接从路径或内存缓冲区解码，无需再写临时视频文件
+    video_source = None
+    if shared_frames is None:
+        video_source = to_video_source(video)
+        if video_source is None:
+            return None
     
-    # 创建临时文件来存储视频数据
-    temp_video_file = None
     temp_best_frame_file = None
     try:
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-            temp_video_file = temp_file.name
-            temp_file.write(video_data)
+        # 流式解码 + 分批检测：每次只持有当前一批帧和目前的最佳帧
+        model = get_face_engine()
+        batch_size = FACE_FRAME_SELECTION["batch_size"]
+        early_exit_score = FACE_FRAME_SELECTION["early_exit_score"]
+        time_budget_s = FACE_FRAME_SELECTION["time_budget_s"]
         
-        # 采样关键帧（I帧）
-        max_frames = 100
-        keyframes = []
-        
-        container = av.open(temp_video_file)
-        for frame in container.decode(video=0):
-            if frame.key_frame:
-                img = frame.to_ndarray(format='bgr24')
-                keyframes.append(img)
-                if len(keyframes) >= max_frames:
-                    break
-        
-        MiraLog("skin_analysis", f"[extract_best_face_frame] 采样到关键帧数: {len(keyframes)}")
-        
-        if not keyframes:
-            MiraLog("skin_analysis", "[extract_best_face_frame] 未采样到任何关键帧", "WARNING")
-            return None
-        
-        # 人脸检测与关键点提取
-        model = insightface.app.FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])
-        model.prepare(ctx_id=0)
+        # 两阶段模式下先在缩小的帧上粗检，胜出帧再在原分辨率上精修
+        two_stage = FACE_DETECTION["mode"] == "two_stage"
+        det_kwargs = {"scale": FACE_DETECTION["coarse_scale"], "input_size": FACE_DETECTION["coarse_det_size"]} if two_stage else {}
         
         best_score = -1
         best_kps_count = 0
         best_frame = None
+        best_bbox = None
+        frame_count = 0
+        start_time = time.time()
         
-        for idx, frame in enumerate(keyframes):
-            faces = model.get(frame)
-            MiraLog("skin_analysis", f"[extract_best_face_frame] 第{idx+1}帧检测到人脸数: {len(faces) if faces else 0}")
-            
-            if not faces:
-                continue
-                
-            face = faces[0]
-            kps = face.kps
-            kps_count = kps.shape[0]
-            score = face.det_score
-            
-            MiraLog("skin_analysis", f"[extract_best_face_frame] 第{idx+1}帧关键点数: {kps_count}, 置信度: {score}")
-            
-            if kps_count < 5:
-                continue
+        # 开启预筛选时，每个窗口先按清晰度/曝光/运动打分，只把 top_k 帧送入检测
+        use_prefilter = FRAME_PREFILTER["enabled"]
+        window_size = FRAME_PREFILTER["window_size"] if use_prefilter else batch_size
+        
+        def score_batch(batch, first_idx):
+            nonlocal best_score, best_kps_count, best_frame, best_bbox
+            indices = select_top_frames(batch, FRAME_PREFILTER["top_k"]) if use_prefilter else list(range(len(batch)))
+            candidates = [batch[i] for i in indices]
+            # 批内只跑检测模型，关键点/属性模型留给最终胜出的帧
+            for i, frame, (bboxes, kpss) in zip(indices, candidates, detect_faces_batch(candidates, model, **det_kwargs)):
+                idx = first_idx + i
+                MiraLog("skin_analysis", f"[extract_best_face] 第{idx+1}帧检测到人脸数: {len(bboxes)}")
+                if len(bboxes) == 0 or kpss is None:
+                    continue
+                kps_count = kpss[0].shape[0]
+                score = float(bboxes[0, 4])
+                MiraLog("skin_analysis", f"[extract_best_face] 第{idx+1}帧关键点数: {kps_count}, 置信度: {score}")
+                if kps_count >= 5 and (kps_count > best_kps_count or (kps_count == best_kps_count and score > best_score)):
+                    best_kps_count = kps_count
+                    best_score = score
+                    best_frame = frame
+                    best_bbox = bboxes[0]
+        
+        with (nullcontext(None) if shared_frames else av.open(video_source)) as container:
+            batch = []
+            for frame in (shared_frames.iter_frames() if shared_frames else iter_video_frames(container)):
+                batch.append(frame)
+                frame_count += 1
+                if len(batch) < window_size:
+                    continue
+                score_batch(batch, frame_count - len(batch))
+                batch = []
                 
-            if kps_count > best_kps_count or (kps_count == best_kps_count and score > best_score):
-                best_kps_count = kps_count
-                best_score = score
-                best_frame = frame
+                # 提前结束：质量已达标或超出时间预算
+                if best_frame is not None and best_score >= early_exit_score:
+                    MiraLog("skin_analysis", f"[extract_best_face] 第{frame_count}帧前置信度已达到 {early_exit_score}，提前结束解码")
+                    break
+                if time.time() - start_time > time_budget_s:
+                    MiraLog("skin_analysis", f"[extract_best_face] 超出时间预算 {time_budget_s}s，停止解码", "WARNING")
+                    break
+            if batch:
+                score_batch(batch, frame_count - len(batch))
+        
+        MiraLog("skin_analysis", f"[extract_best_face] 共处理采样帧数: {frame_count}，耗时 {time.time() - start_time:.2f}s")
+        
+        if frame_count == 0:
+            MiraLog("skin_analysis", "[extract_best_face] 未采样到任何视频帧", "WARNING")
+            return None
         
         if best_frame is None or best_kps_count < 4:
-            MiraLog("skin_analysis", f"[extract_best_face_frame] 未找到关键点数>=4的最佳帧，best_kps_count={best_kps_count}", "WARNING")
+            MiraLog("skin_analysis", f"[extract_best_face] 未找到关键点数>=4的最佳帧，best_kps_count={best_kps_count}", "WARNING")
             return None
         
+        # 只对胜出的帧运行完整的人脸分析（关键点、属性模型）
+        faces = [refine_face(best_frame, best_bbox, model)] if two_stage else model.get(best_frame)
+        if not faces or faces[0] is None:
+            MiraLog("skin_analysis", "[extract_best_face] 最佳帧完整分析未检测到人脸", "WARNING")
+            return None
+        
+        face = faces[0]
+        
         # 将最佳帧保存为临时文件
         temp_best_frame_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False).name
         cv2.imwrite(temp_best_frame_file, best_frame)
         
-        MiraLog("skin_analysis", f"[extract_best_face_frame] 已选取最佳帧，关键点数: {best_kps_count}, 置信度: {best_score}")
-        return temp_best_frame_file
+        result = {
+            "score": float(face.det_score),
+            "kps_count": int(face.kps.shape[0]),
+            "bbox": face.bbox.tolist(),
+            "kps": face.kps.tolist(),
+            "pose": face.pose.tolist() if face.get("pose") is not None else None,
+        }
+        put_cached_face(cache_key, temp_best_frame_file, result)
+        
+        MiraLog("skin_analysis", f"[extract_best_face] 已选取最佳帧，关键点数: {best_kps_count}, 置信度: {best_score}")
+        return {**result, "path": temp_best_frame_file}
         
     except Exception as e:
-        MiraLog("skin_analysis", f"[extract_best_face_frame] 处理过程发生异常: {e}", "ERROR")
+        MiraLog("skin_analysis", f"[extract_best_face] 处理过程发生异常: {e}", "ERROR")
         import traceback
         MiraLog("skin_analysis", traceback.format_exc(), "ERROR")
         return None
-        
-    finally:
-        # 清理临时视频文件
-        if temp_video_file and os.path.exists(temp_video_file):
-            try:
-                os.unlink(temp_video_file)
-            except:
-                pass
+
+def prefetch_best_face(bundle):
+    """在视频处理进程池中基于 MediaBundle 的采样帧提取最佳人脸帧，供视频上传后提前执行"""
+    from utils.video_pool import run_in_video_pool
+    return run_in_video_pool(extract_best_face, bundle.frames or bundle.path)
+
+def discard_best_face(result):
+    """删除 extract_best_face 结果中的最佳帧临时文件（结果不再使用时调用）"""
+    if result and result.get("path") and os.path.exists(result["path"]):
+        os.remove(result["path"])
+
+def extract_best_face_frame(video):
+    """
+    从视频中选取最佳人脸帧，返回最佳帧的临时文件路径。
+    :param video: 同 extract_best_face
+    :return: 最佳帧图片的临时文件路径(str)，无有效帧时返回 None
+    """
+    result = extract_best_face(video)
+    return result["path"] if result else None
 
 def get_image_base64(image_path):
     """
@@ -398,10 +441,11 @@ def get_image_base64(image_path):
         MiraLog("skin_analysis", f"图片转base64失败: {e}", "ERROR")
         return None
 
-def skin_analysis(image_path, config):
+def skin_analysis(image_path, config, face_info=None):
     """
     调用 YouCam API 进行肤质分析。
     :param image_path: 图片文件路径
+    :param face_info: extract_best_face 返回的人脸框/关键点信息，用于裁剪面部区域
     :return: 原始分析结果，异常时抛出异常或返回 None
     """
     MiraLog("skin_analysis", f"开始肤质分析，输入图片路径: {image_path}")
@@ -416,10 +460,9 @@ def skin_analysis(image_path, config):
             MiraLog("skin_analysis", "获取access_token失败", "ERROR")
             raise RuntimeError("获取access_token失败")
     
-    # 2. 读取图片数据
+    # 2. 读取图片数据：裁剪面部区域并压缩到上传预算以内
     try:
-        with open(image_path, "rb") as image_file:
-            image_bytes = image_file.read()
+        image_bytes = prepare_face_image(image_path, face_info, "youcam")
     except Exception as e:
         MiraLog("skin_analysis", f"读取图片文件失败: {e}", "ERROR")
         raise ValueError(f"读取图片文件失败: {e}")
@@ -476,12 +519,7 @@ def skin_feedback(data, config):
         f"{data}\n\n"
         f"{formatted_info}"
     )
-    llm = ChatOpenAI(
-        model_name=config['configurable'].get("chat_model_name"), 
-        temperature=0, 
-        openai_api_key=config['configurable'].get("chat_api_key"), 
-        openai_api_base=config['configurable'].get("chat_api_base")
-    )
+    llm = get_chat_model(config['configurable'], temperature=0)
     messages = [
         SystemMessage(content=SYSTEM_PROMPT),
         HumanMessage(content="我的皮肤检测结果怎么样？")
@@ -493,15 +531,18 @@ def skin_feedback(data, config):
                 yield chunk.content
     return stream_gen()
 
-def skin_analysis_by_QwenYi(image_path, config):
+def skin_analysis_by_QwenYi(image_path, config, face_info=None):
     """
     调用 QwenYi API 进行肤质分析。
     :param image_path: 图片文件路径
+    :param face_info: extract_best_face 返回的人脸框/关键点信息，用于裁剪面部区域
     :return: 原始分析结果，异常时抛出异常或返回 None
     """
-    # 将图片转换为base64
-    image_base64 = get_image_base64(image_path)
-    if not image_base64:
+    # 裁剪面部区域、压缩后转换为base64，减少上传体积与图像 token
+    try:
+        image_base64 = base64.b64encode(prepare_face_image(image_path, face_info, "vlm")).decode('utf-8')
+    except Exception as e:
+        MiraLog("skin_analysis", f"图片预处理失败: {e}", "ERROR")
         raise ValueError("图片转base64失败")
 
     SYSTEM_PROMPT = (
@@ -536,12 +577,7 @@ def skin_analysis_by_QwenYi(image_path, config):
         }
     ])
 
-    llm = ChatOpenAI(
-        model_name=config['configurable'].get("chat_model_name"), 
-        temperature=0, 
-        openai_api_key=config['configurable'].get("chat_api_key"), 
-        openai_api_base=config['configurable'].get("chat_api_base")
-    ).with_structured_output(method="json_mode")
+    llm = get_chat_model(config['configurable'], output="json", temperature=0)
     messages = [
         SystemMessage(content=SYSTEM_PROMPT),
         image_message
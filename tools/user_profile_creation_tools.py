@@ -1,7 +1,11 @@
 import base64
 import mimetypes
-from langchain_openai import ChatOpenAI
+from utils.llm import get_chat_model
 from langchain_core.messages import HumanMessage
+from config import FACE_FEATURES_INPUT, FACE_IMAGE_TARGETS, FRAME_SAMPLING
+from utils.loggers import MiraLog
+from utils.video_pool import run_in_video_pool
+from tools.common.media import SharedFrames, get_media_bundle
 
 def video_to_base64(video_path: str):
     """
@@ -14,50 +18,148 @@ def video_to_base64(video_path: str):
     return base64_video, mime_type or "video/mp4"
 
 
-def analyze_face_features_with_llm(video_path, config) -> dict:
+def _yaw_ratio(kps):
     """
-    用LLM分析面部视频，提取五官特征、肤色、肤质等结构化信息。
-    输入: 视频文件路径
-    输出: dict，包含face_features, skin_color, skin_quality等字段
+    用 5 点关键点粗略估计人脸偏转：鼻尖相对双眼中点的水平偏移 / 双眼间距。
+    0 附近为正脸，绝对值越大越接近侧脸，正负表示偏转方向。
+    """
+    left_eye, right_eye, nose = kps[0], kps[1], kps[2]
+    eye_dist = abs(right_eye[0] - left_eye[0]) or 1.0
+    return float((nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_dist)
+
+
+def select_face_frames(video_path, max_frames: int = None) -> list:
+    """
+    在本地从视频中挑选少量多样、高质量的人脸帧：优先一张正脸，以及左右侧脸（如果有），
+    其余名额按画面质量补齐。每帧裁剪面部区域并压缩为 JPEG。
+    :param video_path: 视频文件路径，或 MediaBundle 已解码的采样帧（SharedFrames）
+    :return: JPEG 字节列表，未检测到人脸时返回空列表
     """
-    base64_video, mime_type = video_to_base64(video_path)
-    prompt = (
-        "请分析用户上传的面部视频，精准识别并打标以下面部特征，输出 JSON，字段内容为中文。\n\n"
-        "【需要提取的面部特征及标签】\n"
-        "1. face_features（五官特征）：\n"
-        "    - 脸型（face_shape）：方脸、圆脸、瓜子脸、方圆脸、鹅蛋脸、高颧骨\n"
-        "    - 眼睛（eyes）：单眼皮、双眼皮、大眼睛、小眼睛\n"
-        "    - 鼻子（nose）：大鼻子、小鼻子、高鼻梁、低鼻梁\n"
-        "    - 嘴巴（mouth）：大嘴、小嘴\n"
-        "    - 眉毛（eyebrows）：浓眉、淡眉\n"
-        "2. 肤色（skin_color）：黄1白、黄2白、黑皮、白皮\n"
-        "3. 肤质标签（skin_type）：痘肌、黑眼圈、敏感肌、黑头、毛孔粗大、干皮、油皮、混干皮、混油皮、色斑、皮肤暗沉\n"
-        "\n"
-        "请严格按照上述标签进行面部特征识别和 AI 打标，并输出如下 JSON 格式：\n"
-        "{\n"
-        '  "face_features": {\n'
-        '    "face_shape": "",\n'
-        '    "eyes": "",\n'
-        '    "nose": "",\n'
-        '    "mouth": "",\n'
-        '    "eyebrows": ""\n'
-        "  },\n"
-        '  "skin_color": "",\n'
-        '  "skin_type": []\n'
-        "}\n"
-        "其中 skin_type 字段为数组，可多选。\n"
-        "分析时请确保每个字段都给出最符合实际的视频特征标签。"
-        f"\n视频内容：{video_path}"
-    )
-    messages = [HumanMessage(content=[
+    import av
+    from utils.face_engine import get_face_engine, detect_faces_batch
+    from tools.common.video import iter_sampled_frames, frame_quality_scores
+    from tools.common.image import crop_face, resize_long_side, encode_jpeg_to_budget
+
+    max_frames = max_frames or FACE_FEATURES_INPUT["max_frames"]
+    spec = FACE_IMAGE_TARGETS["face_features"]
+    # 采样时先缩小到目标分辨率附近，控制内存占用
+    if isinstance(video_path, SharedFrames):
+        frames = [resize_long_side(frame, spec["long_side"] * 2) for frame in video_path.iter_frames()]
+    else:
+        with av.open(video_path) as container:
+            frames = [resize_long_side(frame, spec["long_side"] * 2)
+                      for frame in iter_sampled_frames(container, FACE_FEATURES_INPUT["num_samples"], FRAME_SAMPLING["time_budget_s"])]
+    if not frames:
+        return []
+
+    quality = frame_quality_scores(frames)
+    candidates = []  # (下标, 偏转比, 质量分, bbox, kps)
+    for idx, (bboxes, kpss) in enumerate(detect_faces_batch(frames, get_face_engine())):
+        if len(bboxes) == 0 or kpss is None:
+            continue
+        candidates.append((idx, _yaw_ratio(kpss[0]), float(quality[idx]) * float(bboxes[0, 4]), bboxes[0], kpss[0]))
+    if not candidates:
+        return []
+
+    profile_ratio = FACE_FEATURES_INPUT["profile_yaw_ratio"]
+    chosen = [max(candidates, key=lambda c: c[2] - abs(c[1]))]  # 正脸：质量高且偏转小
+    # 没有正脸时上面选出的可能本身就是侧脸，填充侧脸与补齐名额时按帧下标排除已选帧，避免同一帧重复发送
+    chosen_idx = {chosen[0][0]}
+    for is_side in (lambda c: c[1] <= -profile_ratio, lambda c: c[1] >= profile_ratio):
+        side = [c for c in candidates if is_side(c) and c[0] not in chosen_idx]
+        if side and len(chosen) < max_frames:
+            pick = max(side, key=lambda c: c[2])
+            chosen.append(pick)
+            chosen_idx.add(pick[0])
+    for c in sorted(candidates, key=lambda c: c[2], reverse=True):
+        if len(chosen) >= max_frames:
+            break
+        # 补齐时跳过已选帧以及与已选帧偏转相近的帧，保证多样性
+        if c[0] not in chosen_idx and all(abs(c[1] - other[1]) > profile_ratio / 2 for other in chosen):
+            chosen.append(c)
+            chosen_idx.add(c[0])
+
+    images = []
+    for idx, yaw, _, bbox, kps in sorted(chosen, key=lambda c: c[0]):
+        face_img = resize_long_side(crop_face(frames[idx], bbox, kps, spec["padding"]), spec["long_side"])
+        images.append(encode_jpeg_to_budget(face_img, spec["max_bytes"]))
+    MiraLog("user_profile_creation", f"[select_face_frames] 采样 {len(frames)} 帧，检出人脸 {len(candidates)} 帧，选出 {len(images)} 帧，共 {sum(len(i) for i in images)} 字节")
+    return images
+
+
+FACE_FEATURES_PROMPT = (
+    "请分析用户上传的{source}，精准识别并打标以下面部特征，输出 JSON，字段内容为中文。\n\n"
+    "【需要提取的面部特征及标签】\n"
+    "1. face_features（五官特征）：\n"
+    "    - 脸型（face_shape）：方脸、圆脸、瓜子脸、方圆脸、鹅蛋脸、高颧骨\n"
+    "    - 眼睛（eyes）：单眼皮、双眼皮、大眼睛、小眼睛\n"
+    "    - 鼻子（nose）：大鼻子、小鼻子、高鼻梁、低鼻梁\n"
+    "    - 嘴巴（mouth）：大嘴、小嘴\n"
+    "    - 眉毛（eyebrows）：浓眉、淡眉\n"
+    "2. 肤色（skin_color）：黄1白、黄2白、黑皮、白皮\n"
+    "3. 肤质标签（skin_type）：痘肌、黑眼圈、敏感肌、黑头、毛孔粗大、干皮、油皮、混干皮、混油皮、色斑、皮肤暗沉\n"
+    "\n"
+    "请严格按照上述标签进行面部特征识别和 AI 打标，并输出如下 JSON 格式：\n"
+    "{{\n"
+    '  "face_features": {{\n'
+    '    "face_shape": "",\n'
+    '    "eyes": "",\n'
+    '    "nose": "",\n'
+    '    "mouth": "",\n'
+    '    "eyebrows": ""\n'
+    "  }},\n"
+    '  "skin_color": "",\n'
+    '  "skin_type": []\n'
+    "}}\n"
+    "其中 skin_type 字段为数组，可多选。\n"
+    "分析时请确保每个字段都给出最符合实际的{source}特征标签。"
+)
+
+
+def build_face_features_messages(video_path, mode: str = None) -> list:
+    """
+    构造面部特征分析请求。
+    :param mode: "frames" 发送本地挑选的人脸帧图片；"video" 发送整段视频。默认取 FACE_FEATURES_INPUT["mode"]
+    """
+    mode = mode or FACE_FEATURES_INPUT["mode"]
+    # 本轮已登记 MediaBundle 时复用其解码结果与 base64 编码
+    bundle = get_media_bundle(video_path)
+    if mode == "frames":
+        try:
+            frames = bundle.frames if bundle else None
+            images = run_in_video_pool(select_face_frames, frames or video_path)
+        except Exception as e:
+            MiraLog("user_profile_creation", f"[build_face_features_messages] 挑选人脸帧失败: {e}", "ERROR")
+            images = []
+        if images:
+            content = [{"type": "text", "text": FACE_FEATURES_PROMPT.format(source="面部图片（同一段视频中不同角度的多帧）")}]
+            for image in images:
+                content.append({
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/jpeg;base64,{base64.b64encode(image).decode('utf-8')}"}
+                })
+            return [HumanMessage(content=content)]
+        MiraLog("user_profile_creation", "[build_face_features_messages] 未挑选到人脸帧，改为发送整段视频", "WARNING")
+
+    if bundle:
+        video_url = bundle.data_url
+    else:
+        base64_video, mime_type = video_to_base64(video_path)
+        video_url = f"data:{mime_type};base64,{base64_video}"
+    prompt = FACE_FEATURES_PROMPT.format(source="面部视频") + f"\n视频内容：{video_path}"
+    return [HumanMessage(content=[
         {"type": "text", "text": prompt},
-        {"type": "video_url", "video_url": {"url": f"data:{mime_type};base64,{base64_video}"}}
+        {"type": "video_url", "video_url": {"url": video_url}}
     ])]
-    llm = ChatOpenAI(
-        model=config['configurable'].get("chat_model_name"),
-        openai_api_base=config['configurable'].get("chat_api_base"),
-        openai_api_key=config['configurable'].get("chat_api_key"),
-        streaming=False
-    ).with_structured_output(method="json_mode")
+
+
+def analyze_face_features_with_llm(video_path, config, mode: str = None) -> dict:
+    """
+    用LLM分析面部视频，提取五官特征、肤色、肤质等结构化信息。
+    输入: 视频文件路径；mode 见 build_face_features_messages
+    输出: dict，包含face_features, skin_color, skin_quality等字段
+    """
+    messages = build_face_features_messages(video_path, mode)
+    llm = get_chat_model(config['configurable'], output="json")
     response = llm.invoke(messages)
     return response
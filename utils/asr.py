@@ -0,0 +1,201 @@
+"""
+语音识别（ASR）后端：统一的后端接口 + 按名称注册的实现。
+- google：speech_recognition 的 Google Web Speech 远端识别
+- faster_whisper：本地 CPU 离线识别，模型常驻内存，可配置线程数（可选依赖 faster-whisper）
+识别前先用 VAD 裁掉静音并把长语音分段，各段并行识别后按顺序拼接。
+每次调用记录耗时与实时率（RTF = 识别耗时 / 音频时长），识别失败时记录错误日志。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from config import ASR
+from utils.loggers import MiraLog
+from utils.vad import detect_speech_segments
+
+
+class ASRError(RuntimeError):
+    """语音识别后端调用失败"""
+
+
+class ASRBackend:
+    """ASR 后端接口：输入单声道 16bit PCM，输出识别文本"""
+    name = ""
+
+    def warmup(self):
+        """预加载模型等资源，默认无需预热"""
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        raise NotImplementedError
+
+
+class GoogleBackend(ASRBackend):
+    name = "google"
+
+    def __init__(self, language: str = None, **_):
+        self.language = language or ASR["language"]
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = ASR["google"]["timeout_s"]
+        try:
+            return recognizer.recognize_google(sr.AudioData(pcm, sample_rate, 2), language=self.language)
+        except sr.UnknownValueError:
+            # 音频中没有可识别的语音，属于正常结果
+            return ""
+        except sr.RequestError as e:
+            raise ASRError(f"Google 语音识别请求失败: {e}") from e
+
+
+class FasterWhisperBackend(ASRBackend):
+    name = "faster_whisper"
+
+    def __init__(self, **overrides):
+        self.options = {**ASR["faster_whisper"], **overrides}
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warmup(self):
+        self._get_model()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from faster_whisper import WhisperModel
+                    except ImportError as e:
+                        raise ASRError("未安装 faster-whisper，无法使用本地语音识别：pip install faster-whisper") from e
+                    start_time = time.time()
+                    self._model = WhisperModel(
+                        self.options["model"],
+                        device=self.options["device"],
+                        compute_type=self.options["compute_type"],
+                        cpu_threads=self.options["cpu_threads"],
+                        num_workers=self.options["num_workers"],
+                    )
+                    MiraLog("asr", f"[faster_whisper] 模型 {self.options['model']} 加载完成，"
+                                   f"cpu_threads={self.options['cpu_threads']}，耗时 {time.time() - start_time:.2f}s")
+        return self._model
+
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        import numpy as np
+
+        if sample_rate != 16000:
+            raise ASRError(f"faster_whisper 需要 16kHz 音频，实际为 {sample_rate}Hz")
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self._get_model().transcribe(
+            audio,
+            language=self.options["language"],
+            beam_size=self.options["beam_size"],
+        )
+        return "".join(segment.text for segment in segments).strip()
+
+
+_BACKEND_CLASSES = {
+    GoogleBackend.name: GoogleBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+_backends: Dict[str, ASRBackend] = {}
+_backends_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, dict] = {}
+
+_segment_executor = ThreadPoolExecutor(max_workers=ASR["vad"]["max_parallel"], thread_name_prefix="asr-segment")
+
+
+def get_asr_backend(name: str = None) -> ASRBackend:
+    """获取常驻的 ASR 后端实例，默认取 ASR["backend"]"""
+    name = name or ASR["backend"]
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            if name not in _BACKEND_CLASSES:
+                raise ValueError(f"未知的 ASR 后端: {name}，可选: {list(_BACKEND_CLASSES)}")
+            backend = _BACKEND_CLASSES[name]()
+            _backends[name] = backend
+        return backend
+
+
+def warmup_asr(background: bool = True):
+    """预加载当前配置的 ASR 后端（本地模型加载较慢，建议启动时后台执行）"""
+    def _warmup():
+        try:
+            get_asr_backend().warmup()
+        except Exception as e:
+            MiraLog("asr", f"[warmup_asr] ASR 后端预热失败: {e}", "ERROR")
+
+    if background:
+        threading.Thread(target=_warmup, name="asr-warmup", daemon=True).start()
+    else:
+        _warmup()
+
+
+def _record(name: str, latency_s: float, audio_s: float, failed: bool):
+    with _metrics_lock:
+        m = _metrics.setdefault(name, {"calls": 0, "failed": 0, "total_latency_s": 0.0, "total_audio_s": 0.0})
+        m["calls"] += 1
+        m["failed"] += int(failed)
+        m["total_latency_s"] += latency_s
+        m["total_audio_s"] += audio_s
+
+
+def _transcribe_segments(backend: ASRBackend, pcm: bytes, sample_rate: int, use_vad: bool):
+    """
+    VAD 裁剪静音并分段，多段时并行识别后按时间顺序拼接。
+    :return: (识别文本, 实际送识别的音频时长)
+    """
+    if not use_vad:
+        return backend.transcribe(pcm, sample_rate), len(pcm) / 2 / sample_rate
+    segments = detect_speech_segments(pcm, sample_rate)
+    if not segments:
+        return "", 0.0
+    # 采样点下标换算为字节偏移（16bit）
+    chunks = [pcm[start * 2:end * 2] for start, end in segments]
+    speech_s = sum(len(chunk) for chunk in chunks) / 2 / sample_rate
+    if len(chunks) == 1:
+        return backend.transcribe(chunks[0], sample_rate), speech_s
+    texts = _segment_executor.map(lambda chunk: backend.transcribe(chunk, sample_rate), chunks)
+    return ASR["vad"]["joiner"].join(t.strip() for t in texts if t), speech_s
+
+
+def transcribe_pcm(pcm: bytes, sample_rate: int, backend: Optional[ASRBackend] = None, vad: bool = None) -> str:
+    """
+    识别一段单声道 16bit PCM 音频，记录耗时与实时率。
+    识别失败时记录错误日志并返回空字符串，对话流程继续进行。
+    :param vad: 是否先做 VAD 裁剪与分段，默认取 ASR["vad"]["enabled"]
+    """
+    backend = backend or get_asr_backend()
+    use_vad = ASR["vad"]["enabled"] if vad is None else vad
+    audio_s = len(pcm) / 2 / sample_rate if sample_rate else 0.0
+    if not pcm:
+        MiraLog("asr", f"[{backend.name}] 音频为空，跳过识别")
+        return ""
+    start_time = time.perf_counter()
+    try:
+        text, speech_s = _transcribe_segments(backend, pcm, sample_rate, use_vad)
+    except Exception as e:
+        latency_s = time.perf_counter() - start_time
+        _record(backend.name, latency_s, audio_s, failed=True)
+        MiraLog("asr", f"[{backend.name}] 语音识别失败（音频 {audio_s:.2f}s，耗时 {latency_s:.2f}s）: {e}", "ERROR")
+        return ""
+    latency_s = time.perf_counter() - start_time
+    _record(backend.name, latency_s, audio_s, failed=False)
+    rtf = latency_s / audio_s if audio_s else 0.0
+    MiraLog("asr", f"[{backend.name}] 音频 {audio_s:.2f}s（VAD 后 {speech_s:.2f}s），耗时 {latency_s:.2f}s，RTF {rtf:.3f}，文本长度 {len(text)}")
+    return text
+
+
+def get_asr_metrics() -> dict:
+    """返回各后端的调用次数、失败次数、平均耗时与整体实时率"""
+    with _metrics_lock:
+        metrics = {name: dict(m) for name, m in _metrics.items()}
+    for m in metrics.values():
+        m["avg_latency_s"] = m["total_latency_s"] / m["calls"] if m["calls"] else 0.0
+        m["rtf"] = m["total_latency_s"] / m["total_audio_s"] if m["total_audio_s"] else 0.0
+    return metrics
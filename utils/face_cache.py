@@ -0,0 +1,147 @@
+"""
+最佳人脸帧结果缓存：以视频内容哈希为 key，缓存选出的最佳帧（JPEG）及其置信度、关键点。
+缓存完全落盘，多个进程（包括视频处理进程池的 worker）共享同一份缓存。
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from config import FACE_FRAME_CACHE
+from utils.loggers import MiraLog
+
+_evict_lock = threading.Lock()
+
+
+def video_content_hash(video) -> Optional[str]:
+    """
+    计算视频内容哈希（blake2b，分块读取，不整体载入内存）。
+    :param video: 文件路径、bytes/memoryview、io.BytesIO 或 base64 字符串
+    :return: 十六进制哈希字符串，无法计算时返回 None
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    try:
+        if isinstance(video, str) and os.path.exists(video):
+            with open(video, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(chunk)
+        elif isinstance(video, io.BytesIO):
+            hasher.update(video.getbuffer())
+        elif isinstance(video, (bytes, bytearray, memoryview)):
+            hasher.update(video)
+        elif isinstance(video, str):
+            hasher.update(video.split(',', 1)[-1].encode("utf-8"))
+        else:
+            return None
+    except Exception as e:
+        MiraLog("skin_analysis", f"[face_cache] 计算视频哈希失败: {e}", "ERROR")
+        return None
+    return hasher.hexdigest()
+
+
+def _entry_paths(key: str):
+    cache_dir = FACE_FRAME_CACHE["dir"]
+    return os.path.join(cache_dir, f"{key}.jpg"), os.path.join(cache_dir, f"{key}.json")
+
+
+def get_cached_face(key: Optional[str]) -> Optional[dict]:
+    """
+    查询缓存。命中时把缓存图片复制为新的临时文件（调用方可自行删除），并刷新访问时间。
+    :return: {"path", "score", "kps_count", "bbox", "kps"}，未命中返回 None
+    """
+    if not key or not FACE_FRAME_CACHE["enabled"]:
+        return None
+    image_path, meta_path = _entry_paths(key)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if time.time() - meta.get("created_at", 0) > FACE_FRAME_CACHE["max_age_hours"] * 3600:
+            _remove_entry(key)
+            return None
+        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
+            with open(image_path, "rb") as cached:
+                shutil.copyfileobj(cached, temp_file)
+            path = temp_file.name
+        # 用 mtime 记录最近访问时间，供按大小淘汰时使用
+        os.utime(meta_path, None)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        MiraLog("skin_analysis", f"[face_cache] 读取缓存失败: {e}", "WARNING")
+        return None
+    MiraLog("skin_analysis", f"[face_cache] 命中最佳帧缓存: {key}")
+    return {**meta, "path": path}
+
+
+def put_cached_face(key: Optional[str], image_path: str, meta: dict):
+    """
+    写入缓存：复制最佳帧图片，并写入置信度、关键点等元数据。
+    """
+    if not key or not FACE_FRAME_CACHE["enabled"]:
+        return
+    cache_image_path, meta_path = _entry_paths(key)
+    try:
+        os.makedirs(FACE_FRAME_CACHE["dir"], exist_ok=True)
+        shutil.copyfile(image_path, cache_image_path)
+        # 先写临时文件再替换，避免其他进程读到写了一半的元数据
+        tmp_meta_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta_path, "w", encoding="utf-8") as f:
+            json.dump({**meta, "created_at": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp_meta_path, meta_path)
+        MiraLog("skin_analysis", f"[face_cache] 已缓存最佳帧: {key}")
+    except Exception as e:
+        MiraLog("skin_analysis", f"[face_cache] 写入缓存失败: {e}", "WARNING")
+        return
+    _evict()
+
+
+def _remove_entry(key: str):
+    for path in _entry_paths(key):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _evict():
+    """按年龄与总大小淘汰缓存：先删除超过最大年龄的条目，再按最近访问时间从旧到新删除，直到低于大小上限"""
+    cache_dir = FACE_FRAME_CACHE["dir"]
+    max_bytes = FACE_FRAME_CACHE["max_size_mb"] * 1024 * 1024
+    max_age_s = FACE_FRAME_CACHE["max_age_hours"] * 3600
+    now = time.time()
+    with _evict_lock:
+        try:
+            entries = []
+            total_size = 0
+            for filename in os.listdir(cache_dir):
+                if not filename.endswith(".json"):
+                    continue
+                key = filename[:-len(".json")]
+                image_path, meta_path = _entry_paths(key)
+                try:
+                    # 图片 mtime 为写入时间，元数据 mtime 为最近访问时间
+                    image_stat = os.stat(image_path)
+                    last_access = os.path.getmtime(meta_path)
+                except FileNotFoundError:
+                    continue
+                size = image_stat.st_size
+                if now - image_stat.st_mtime > max_age_s:
+                    _remove_entry(key)
+                    continue
+                entries.append((last_access, key, size))
+                total_size += size
+
+            entries.sort()
+            for _, key, size in entries:
+                if total_size <= max_bytes:
+                    break
+                _remove_entry(key)
+                total_size -= size
+                MiraLog("skin_analysis", f"[face_cache] 淘汰缓存条目: {key}")
+        except Exception as e:
+            MiraLog("skin_analysis", f"[face_cache] 淘汰缓存失败: {e}", "WARNING")
@@ -0,0 +1,286 @@
+"""
+进程级人脸检测引擎注册表：insightface FaceAnalysis 只加载一次，供各 Gradio 工作线程共享。
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config import FACE_ENGINE, FACE_DETECTION
+from utils.loggers import MiraLog
+
+# 引擎状态
+STATE_COLD = "cold"        # 尚未加载
+STATE_LOADING = "loading"  # 正在加载
+STATE_WARM = "warm"        # 已加载可用
+STATE_FAILED = "failed"    # 加载失败
+
+_registry_lock = threading.Lock()
+_engines: Dict[Tuple, "_EngineSlot"] = {}
+
+
+class _EngineSlot:
+    """单个引擎的加载状态与指标"""
+
+    def __init__(self, key: Tuple):
+        self.key = key
+        self.lock = threading.Lock()
+        self.state = STATE_COLD
+        self.model = None
+        self.error = None
+        self.load_started_at = None
+        self.load_time_s = None
+        self.requests = 0
+        self.cold_requests = 0
+
+    def load(self):
+        """加载模型，调用方需持有 self.lock"""
+        import insightface
+
+        name, providers, det_size = self.key
+        self.state = STATE_LOADING
+        self.load_started_at = time.time()
+        MiraLog("skin_analysis", f"[face_engine] 开始加载人脸模型: {name}, providers={list(providers)}, det_size={det_size}")
+        try:
+            model = insightface.app.FaceAnalysis(name=name, providers=list(providers))
+            model.prepare(ctx_id=0, det_size=det_size)
+        except Exception as e:
+            self.state = STATE_FAILED
+            self.error = str(e)
+            MiraLog("skin_analysis", f"[face_engine] 人脸模型加载失败: {e}", "ERROR")
+            raise
+        self.model = model
+        self.error = None
+        self.load_time_s = time.time() - self.load_started_at
+        self.state = STATE_WARM
+        MiraLog("skin_analysis", f"[face_engine] 人脸模型加载完成，耗时 {self.load_time_s:.2f}s")
+
+
+def _engine_key(name: Optional[str] = None, providers=None, det_size=None) -> Tuple:
+    name = name or FACE_ENGINE["name"]
+    providers = tuple(providers or FACE_ENGINE["providers"])
+    det_size = tuple(det_size or FACE_ENGINE["det_size"])
+    return name, providers, det_size
+
+
+def _get_slot(key: Tuple) -> _EngineSlot:
+    with _registry_lock:
+        slot = _engines.get(key)
+        if slot is None:
+            slot = _EngineSlot(key)
+            _engines[key] = slot
+        return slot
+
+
+def get_face_engine(name: Optional[str] = None, providers=None, det_size=None):
+    """
+    获取已加载的 FaceAnalysis 实例，首次调用时加载（线程安全，多线程并发只加载一次）。
+    :return: insightface.app.FaceAnalysis 实例
+    """
+    slot = _get_slot(_engine_key(name, providers, det_size))
+    slot.requests += 1
+    if slot.state == STATE_WARM:
+        return slot.model
+    slot.cold_requests += 1
+    with slot.lock:
+        # 等待锁期间可能已被其他线程加载完成
+        if slot.state != STATE_WARM:
+            slot.load()
+        return slot.model
+
+
+def warmup_face_engine(background: bool = True, name: Optional[str] = None, providers=None, det_size=None):
+    """
+    预加载人脸模型。
+    :param background: 是否在后台线程中加载，不阻塞启动
+    :return: 后台加载线程（background=True 时），否则为 None
+    """
+    def _load():
+        try:
+            get_face_engine(name, providers, det_size)
+        except Exception:
+            # 失败已记录日志，首个真实请求会再次尝试加载
+            pass
+
+    if not background:
+        _load()
+        return None
+    thread = threading.Thread(target=_load, name="face-engine-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_face_engine_status() -> Dict[str, dict]:
+    """
+    返回所有已登记引擎的冷/热状态与加载耗时指标，key 为 "模型名@检测尺寸"。
+    """
+    with _registry_lock:
+        slots = list(_engines.values())
+    status = {}
+    for slot in slots:
+        name, providers, det_size = slot.key
+        status[f"{name}@{det_size[0]}x{det_size[1]}"] = {
+            "state": slot.state,
+            "providers": list(providers),
+            "load_time_s": slot.load_time_s,
+            "loading_for_s": time.time() - slot.load_started_at if slot.state == STATE_LOADING else None,
+            "requests": slot.requests,
+            "cold_requests": slot.cold_requests,
+            "error": slot.error,
+        }
+    return status
+
+
+def _letterbox(img, input_size):
+    """按检测模型的方式等比缩放并左上角对齐填充到 input_size，返回 (填充图, 缩放比例)"""
+    import cv2
+    import numpy as np
+
+    im_ratio = float(img.shape[0]) / img.shape[1]
+    model_ratio = float(input_size[1]) / input_size[0]
+    if im_ratio > model_ratio:
+        new_height = input_size[1]
+        new_width = int(new_height / im_ratio)
+    else:
+        new_width = input_size[0]
+        new_height = int(new_width * im_ratio)
+    det_scale = float(new_height) / img.shape[0]
+    det_img = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
+    det_img[:new_height, :new_width, :] = cv2.resize(img, (new_width, new_height))
+    return det_img, det_scale
+
+
+def _detect_batched(det_model, frames, input_size):
+    """
+    将多帧堆叠为一个输入，一次 ONNX 推理完成整批检测（仅适用于导出为批量输出的 SCRFD 模型）。
+    解码逻辑与 insightface SCRFD.forward/detect 保持一致。
+    """
+    import cv2
+    import numpy as np
+    from insightface.model_zoo.scrfd import distance2bbox, distance2kps
+
+    det_imgs, det_scales = zip(*[_letterbox(frame, input_size) for frame in frames])
+    blob = cv2.dnn.blobFromImages(
+        list(det_imgs), 1.0 / det_model.input_std, tuple(input_size),
+        (det_model.input_mean, det_model.input_mean, det_model.input_mean), swapRB=True
+    )
+    net_outs = det_model.session.run(det_model.output_names, {det_model.input_name: blob})
+    input_height, input_width = blob.shape[2], blob.shape[3]
+    fmc = det_model.fmc
+
+    results = []
+    for b, det_scale in enumerate(det_scales):
+        scores_list, bboxes_list, kpss_list = [], [], []
+        for idx, stride in enumerate(det_model._feat_stride_fpn):
+            scores = net_outs[idx][b]
+            bbox_preds = net_outs[idx + fmc][b] * stride
+            height, width = input_height // stride, input_width // stride
+            key = (height, width, stride)
+            anchor_centers = det_model.center_cache.get(key)
+            if anchor_centers is None:
+                anchor_centers = np.stack(np.mgrid[:height, :width][::-1], axis=-1).astype(np.float32)
+                anchor_centers = (anchor_centers * stride).reshape((-1, 2))
+                if det_model._num_anchors > 1:
+                    anchor_centers = np.stack([anchor_centers] * det_model._num_anchors, axis=1).reshape((-1, 2))
+                if len(det_model.center_cache) < 100:
+                    det_model.center_cache[key] = anchor_centers
+            pos_inds = np.where(scores >= det_model.det_thresh)[0]
+            scores_list.append(scores[pos_inds])
+            bboxes_list.append(distance2bbox(anchor_centers, bbox_preds)[pos_inds])
+            if det_model.use_kps:
+                kps_preds = net_outs[idx + fmc * 2][b] * stride
+                kpss = distance2kps(anchor_centers, kps_preds)
+                kpss_list.append(kpss.reshape((kpss.shape[0], -1, 2))[pos_inds])
+
+        scores = np.vstack(scores_list)
+        order = scores.ravel().argsort()[::-1]
+        bboxes = np.vstack(bboxes_list) / det_scale
+        pre_det = np.hstack((bboxes, scores)).astype(np.float32, copy=False)[order, :]
+        keep = det_model.nms(pre_det)
+        kpss = None
+        if det_model.use_kps:
+            kpss = (np.vstack(kpss_list) / det_scale)[order, :, :][keep, :, :]
+        results.append((pre_det[keep, :], kpss))
+    return results
+
+
+def detector_is_batched(engine=None) -> bool:
+    """检测模型是否导出为批量输出，为 False 时 detect_faces_batch 逐帧检测"""
+    engine = engine or get_face_engine()
+    return bool(getattr(engine.det_model, "batched", False))
+
+
+def detect_faces_batch(frames, engine=None, scale: float = 1.0, input_size=None):
+    """
+    只运行人脸检测模型（不运行关键点/属性模型），对一批帧做检测。
+    只有检测模型导出为批量输出（det_model.batched 为 True）时才整批推理一次；
+    默认 buffalo_l 的检测模型不支持批量输出，此时逐帧调用检测模型。
+    :param frames: BGR ndarray 列表
+    :param engine: FaceAnalysis 实例，默认使用共享引擎
+    :param scale: 检测前对帧的缩放比例（<1 时在缩小的帧上粗检），结果坐标会映射回原分辨率
+    :param input_size: 检测模型输入尺寸，默认使用模型 prepare 时的 det_size
+    :return: 与 frames 一一对应的 (bboxes, kpss) 列表，bboxes 每行为 [x1, y1, x2, y2, score]，按置信度降序
+    """
+    if not frames:
+        return []
+    engine = engine or get_face_engine()
+    det_model = engine.det_model
+    input_size = tuple(input_size or det_model.input_size)
+    if scale != 1.0:
+        import cv2
+        frames = [cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) for frame in frames]
+
+    results = None
+    if detector_is_batched(engine) and len(frames) > 1:
+        try:
+            results = _detect_batched(det_model, frames, input_size)
+        except Exception as e:
+            MiraLog("skin_analysis", f"[face_engine] 批量检测失败，回退逐帧检测: {e}", "WARNING")
+    if results is None:
+        results = [det_model.detect(frame, input_size=input_size, max_num=0, metric='default') for frame in frames]
+
+    if scale != 1.0:
+        import numpy as np
+        results = [
+            (np.hstack([bboxes[:, :4] / scale, bboxes[:, 4:]]), kpss / scale if kpss is not None else None)
+            for bboxes, kpss in results
+        ]
+    return results
+
+
+def refine_face(frame, bbox, engine=None, padding: Optional[float] = None, det_size=None):
+    """
+    两阶段检测的第二阶段：在粗检 bbox 周围带边距的原分辨率裁剪区域上重新检测，
+    再只对这一张脸运行关键点/属性模型。
+    :param frame: 原分辨率 BGR ndarray
+    :param bbox: 粗检得到的 [x1, y1, x2, y2, ...]（原分辨率坐标）
+    :return: insightface Face 对象，裁剪区域内未检出人脸时返回 None
+    """
+    import numpy as np
+    from insightface.app.common import Face
+
+    engine = engine or get_face_engine()
+    padding = FACE_DETECTION["crop_padding"] if padding is None else padding
+    det_size = tuple(det_size or FACE_DETECTION["fine_det_size"])
+
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = [float(v) for v in bbox[:4]]
+    pad_w, pad_h = (x2 - x1) * padding, (y2 - y1) * padding
+    cx1, cy1 = max(int(x1 - pad_w), 0), max(int(y1 - pad_h), 0)
+    cx2, cy2 = min(int(x2 + pad_w), w), min(int(y2 + pad_h), h)
+    if cx2 <= cx1 or cy2 <= cy1:
+        return None
+
+    bboxes, kpss = engine.det_model.detect(frame[cy1:cy2, cx1:cx2], input_size=det_size, max_num=1, metric='default')
+    if len(bboxes) == 0:
+        return None
+    offset = np.array([cx1, cy1], dtype=np.float32)
+    face = Face(
+        bbox=bboxes[0, :4] + np.tile(offset, 2),
+        kps=kpss[0] + offset if kpss is not None else None,
+        det_score=bboxes[0, 4],
+    )
+    for taskname, model in engine.models.items():
+        if taskname == 'detection':
+            continue
+        model.get(frame, face)
+    return face
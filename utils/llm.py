@@ -0,0 +1,152 @@
+"""
+大模型客户端注册表：按 (模型, 接口地址, API Key, 是否流式, 输出模式, 温度) 缓存 ChatOpenAI 实例，
+同一 (接口地址, API Key) 共用一个 httpx 长连接池，复用 TCP/TLS 连接；连接池上限即该 Key 的并发上限。
+所有调用经同一个回调统计次数、失败数、耗时、首 token 延迟与 token 用量。
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_openai import ChatOpenAI
+
+from config import LLM_CLIENT
+from utils.loggers import MiraLog
+
+OUTPUT_MODES = ("text", "json")
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """按模型名统计每次大模型调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: Dict[object, dict] = {}
+        self._metrics: Dict[str, dict] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or "unknown"
+        with self._lock:
+            self._runs[run_id] = {"model": model, "start": time.perf_counter(), "first_token": None}
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run["first_token"] is None:
+                run["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self._finish(run_id, failed=False, tokens=usage.get("total_tokens") or 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        # 调用方主动关闭流式生成器（如合并意图识别时中止生成）不计为失败
+        self._finish(run_id, failed=not isinstance(error, GeneratorExit), error=error)
+
+    def _finish(self, run_id, failed: bool, tokens: int = 0, error=None):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return
+            latency_s = time.perf_counter() - run["start"]
+            ttft_s = run["first_token"] - run["start"] if run["first_token"] else None
+            m = self._metrics.setdefault(run["model"], {
+                "calls": 0, "failed": 0, "total_latency_s": 0.0,
+                "streamed": 0, "total_ttft_s": 0.0, "total_tokens": 0,
+            })
+            m["calls"] += 1
+            m["failed"] += int(failed)
+            m["total_latency_s"] += latency_s
+            m["total_tokens"] += tokens
+            if ttft_s is not None:
+                m["streamed"] += 1
+                m["total_ttft_s"] += ttft_s
+        if failed:
+            MiraLog("llm", f"[{run['model']}] 调用失败，耗时 {latency_s:.2f}s: {error}", "ERROR")
+        else:
+            ttft = f"，首 token {ttft_s:.2f}s" if ttft_s is not None else ""
+            MiraLog("llm", f"[{run['model']}] 耗时 {latency_s:.2f}s{ttft}，tokens {tokens}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = {model: dict(m) for model, m in self._metrics.items()}
+        for m in metrics.values():
+            m["avg_latency_s"] = m["total_latency_s"] / m["calls"] if m["calls"] else 0.0
+            m["avg_ttft_s"] = m["total_ttft_s"] / m["streamed"] if m["streamed"] else 0.0
+        return metrics
+
+
+_metrics_handler = LLMMetricsHandler()
+
+# ChatOpenAI 未显式传入 timeout 时会把 timeout=None 传给 OpenAI 客户端，覆盖 http_client 自带的超时，
+# 因此同一份超时既用于连接池，也显式传给 ChatOpenAI
+_TIMEOUT = httpx.Timeout(
+    connect=LLM_CLIENT["connect_timeout_s"],
+    read=LLM_CLIENT["read_timeout_s"],
+    write=LLM_CLIENT["connect_timeout_s"],
+    pool=LLM_CLIENT["pool_timeout_s"],
+)
+
+_lock = threading.Lock()
+_http_clients: Dict[Tuple[str, str], httpx.Client] = {}
+_models: Dict[tuple, object] = {}
+
+
+def _get_http_client(api_base: str, api_key: str) -> httpx.Client:
+    """同一 (接口地址, API Key) 共用的长连接池，调用方需持有 _lock"""
+    client = _http_clients.get((api_base, api_key))
+    if client is None:
+        client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=LLM_CLIENT["max_connections"],
+                max_keepalive_connections=LLM_CLIENT["max_keepalive"],
+                keepalive_expiry=LLM_CLIENT["keepalive_expiry_s"],
+            ),
+            timeout=_TIMEOUT,
+        )
+        _http_clients[(api_base, api_key)] = client
+        MiraLog("llm", f"创建连接池: {api_base}，最大并发 {LLM_CLIENT['max_connections']}")
+    return client
+
+
+def get_chat_model(model_config: dict, streaming: bool = False, output: str = "text", temperature: Optional[float] = None):
+    """
+    获取共享的大模型实例，相同参数只创建一次。
+    :param model_config: 含 chat_model_name / chat_api_base / chat_api_key 的模型配置
+    :param output: "text" 返回 ChatOpenAI；"json" 返回 json_mode 结构化输出的 Runnable
+    :param temperature: None 时使用模型默认温度
+    """
+    if output not in OUTPUT_MODES:
+        raise ValueError(f"未知的输出模式: {output}，可选: {OUTPUT_MODES}")
+    model = model_config.get("chat_model_name", "")
+    api_base = model_config.get("chat_api_base", "")
+    api_key = model_config.get("chat_api_key", "")
+    cache_key = (model, api_base, api_key, streaming, output, temperature)
+    with _lock:
+        llm = _models.get(cache_key)
+        if llm is None:
+            kwargs = {}
+            if temperature is not None:
+                kwargs["temperature"] = temperature
+            llm = ChatOpenAI(
+                model=model,
+                openai_api_base=api_base,
+                openai_api_key=api_key,
+                streaming=streaming,
+                http_client=_get_http_client(api_base, api_key),
+                timeout=_TIMEOUT,
+                max_retries=LLM_CLIENT["max_retries"],
+                callbacks=[_metrics_handler],
+                **kwargs
+            )
+            if output == "json":
+                llm = llm.with_structured_output(method="json_mode")
+            _models[cache_key] = llm
+        return llm
+
+
+def get_llm_metrics() -> dict:
+    """返回各模型的调用次数、失败次数、平均耗时、平均首 token 延迟与 token 用量"""
+    return _metrics_handler.snapshot()
@@ -0,0 +1,93 @@
+"""
+预合成语音短语库：把固定话术（如建档流程的提问）按所有音色提前合成为只读音频，
+运行时按内容寻址直接取用，不经过 TTS 调用与缓存淘汰。
+
+离线生成：
+    python -m utils.phrase_bank                 # 补齐缺失的短语音频
+    python -m utils.phrase_bank --force         # 全部重新合成
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from config import PHRASE_BANK, PROFILE_CREATION_PROMPTS
+from utils.loggers import MiraLog
+from utils.tts import audio_filename, synthesize_to_file
+
+# 已生成的短语音频文件名集合，首次查询时扫描一次目录
+_bank_lock = threading.Lock()
+_bank_files = None
+
+
+def static_phrases() -> list:
+    """需要预合成的全部固定话术"""
+    return list(dict.fromkeys(PROFILE_CREATION_PROMPTS.values()))
+
+
+def _load_bank() -> set:
+    global _bank_files
+    with _bank_lock:
+        if _bank_files is None:
+            bank_dir = PHRASE_BANK["dir"]
+            _bank_files = set(os.listdir(bank_dir)) if os.path.isdir(bank_dir) else set()
+        return _bank_files
+
+
+def get_phrase_audio(text: str, voice: str, model: str = None) -> Optional[str]:
+    """
+    查询短语库。
+    :return: 预合成音频的文件路径，不在短语库中时返回 None
+    """
+    if not text:
+        return None
+    filename = audio_filename(text, voice, model or PHRASE_BANK["model"])
+    if filename and filename in _load_bank():
+        return os.path.join(PHRASE_BANK["dir"], filename)
+    return None
+
+
+def build_phrase_bank(api_key: str, voices: list = None, force: bool = False) -> int:
+    """
+    为每个音色合成全部固定话术，已存在的文件默认跳过。
+    :return: 本次新合成的音频数
+    """
+    bank_dir = PHRASE_BANK["dir"]
+    model = PHRASE_BANK["model"]
+    Path(bank_dir).mkdir(parents=True, exist_ok=True)
+    built = 0
+    for voice in voices or PHRASE_BANK["voices"]:
+        for text in static_phrases():
+            filename = audio_filename(text, voice, model)
+            save_path = os.path.join(bank_dir, filename)
+            if not force and os.path.exists(save_path):
+                continue
+            try:
+                synthesize_to_file(text, save_path, voice=voice, api_key=api_key, model=model)
+            except Exception as e:
+                MiraLog("tts", f"[phrase_bank] 合成失败（{voice}）{text}: {e}", "ERROR")
+                continue
+            built += 1
+            with _bank_lock:
+                if _bank_files is not None:
+                    _bank_files.add(filename)
+    MiraLog("tts", f"[phrase_bank] 短语库已就绪，新合成 {built} 条，目录：{bank_dir}")
+    return built
+
+
+def build_phrase_bank_in_background(api_key: str):
+    """启动时在后台补齐缺失的短语音频，不阻塞应用启动"""
+    threading.Thread(target=build_phrase_bank, args=(api_key,), name="phrase-bank", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="预合成固定话术的语音短语库")
+    parser.add_argument("--voices", nargs="*", default=None, help="待合成的音色，默认取 PHRASE_BANK['voices']")
+    parser.add_argument("--force", action="store_true", help="忽略已存在的文件，全部重新合成")
+    args = parser.parse_args()
+    count = build_phrase_bank(os.getenv("CHAT_API_KEY", ""), args.voices, args.force)
+    print(f"新合成 {count} 条短语音频")
@@ -6,6 +6,11 @@ from pathlib import Path
 import time
 import shutil
 import re
+import hashlib
+import json
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 from utils.loggers import MiraLog
@@ -13,118 +18,180 @@ from utils.loggers import MiraLog
 # 缓存配置
 AUDIO_CACHE_DIR = "audio_cache"
 MAX_CACHE_SIZE_MB = 100  # 最大缓存大小（MB）
-MAX_CACHE_AGE_HOURS = 1 # 最大缓存时间（小时）
+MAX_CACHE_AGE_HOURS = 1 # 最大缓存时间（小时），超过该时间未被访问的音频会被清理
 CLEANUP_INTERVAL_HOURS = 1  # 清理间隔（小时）
+COSYVOICE_VOICES = ["longwan", "longcheng", "longhua", "longxiaochun"]
+AUDIO_FORMATS = {"qwen-tts": "wav", "cosyvoice-v1": "mp3"}
 
-def _get_cache_size_mb():
-    """获取缓存目录大小（MB）"""
-    total_size = 0
-    for dirpath, _, filenames in os.walk(AUDIO_CACHE_DIR):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            total_size += os.path.getsize(fp)
-    return total_size / (1024 * 1024)  # 转换为MB
+# 内存中的缓存索引：key -> CacheEntry，按最近访问排序（LRU）。
+# 插入、命中、删除时同步维护，合成热路径上只做 O(1) 的记账，不再遍历目录
+_cache_lock = threading.Lock()
+_cache_index = OrderedDict()
+_cache_bytes = 0
+_cache_loaded = False
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+# 相同内容的并发合成只调用一次接口
+_inflight_locks = {}
+# 分句合成使用的线程池
+TTS_WORKERS = 4
+_tts_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+# 句子边界：中文句末标点、换行，以及后接空白的英文句末标点
+_SENTENCE_END = re.compile(r'[。！？；…\n]+|[!?;](?=\s)')
+MIN_SENTENCE_CHARS = 6  # 过短的句子与下一句合并后再合成
+SENTENCE_TIMEOUT_S = 15  # 等待单句合成的超时（秒）
+AUDIO_DEADLINE_S = 60    # 一条回复的全部音频的等待上限（秒），超过后取消剩余合成
+# CosyVoice 合成连接池配置
+COSYVOICE_POOL_SIZE = 4            # 每个 (api_key, 音色) 同时进行的合成数上限
+COSYVOICE_KEEPALIVE_S = 30         # 连接空闲超过该时间视为可能已被服务端断开，重建
+COSYVOICE_ACQUIRE_TIMEOUT_S = 10   # 等待空闲连接的超时（秒）
+_cosyvoice_pools = {}
+_cosyvoice_pools_lock = threading.Lock()
+# SDK 在构造合成器时读取全局 dashscope.api_key，构造过程需要串行
+_dashscope_key_lock = threading.Lock()
+# 后台定时清理线程
+_cleanup_thread = None
+_cleanup_stop = threading.Event()
+
+class CacheEntry:
+    """音频缓存条目：文件路径、字节数、写入时间与最近访问时间"""
+    __slots__ = ("path", "size", "mtime", "last_access")
+
+    def __init__(self, path: str, size: int, mtime: float, last_access: float = None):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.last_access = last_access or mtime
+
+def _remove_files(paths):
+    for file_path in paths:
+        try:
+            os.remove(file_path)
+            MiraLog("tts", f"已删除缓存文件：{file_path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            MiraLog("tts", f"删除文件失败 {file_path}: {str(e)}")
 
 def _cleanup_cache():
-    """清理音频缓存"""
-    MiraLog("tts", "开始清理音频缓存")
-    try:
-        if not os.path.exists(AUDIO_CACHE_DIR):
+    """
+    按索引清理音频缓存：先删除超过最大闲置时间未被访问的条目，再按 LRU 删除直到总大小低于上限。
+    只读取内存索引，不遍历目录。
+    """
+    global _cache_bytes
+    current_time = time.time()
+    expired, evicted = [], []
+    with _cache_lock:
+        for key, entry in list(_cache_index.items()):
+            if current_time - entry.last_access > MAX_CACHE_AGE_HOURS * 3600:
+                del _cache_index[key]
+                _cache_bytes -= entry.size
+                expired.append(entry.path)
+        while _cache_bytes > MAX_CACHE_SIZE_MB * 1024 * 1024 and len(_cache_index) > 1:
+            _, entry = _cache_index.popitem(last=False)
+            _cache_bytes -= entry.size
+            evicted.append(entry.path)
+        _cache_stats["expired"] += len(expired)
+        _cache_stats["evictions"] += len(evicted)
+        size_mb = _cache_bytes / (1024 * 1024)
+    _remove_files(expired + evicted)
+    MiraLog("tts", f"清理音频缓存：过期 {len(expired)} 个，淘汰 {len(evicted)} 个，当前大小 {size_mb:.2f}MB / {MAX_CACHE_SIZE_MB}MB")
+
+def _cleanup_loop():
+    while not _cleanup_stop.wait(CLEANUP_INTERVAL_HOURS * 3600):
+        try:
+            _cleanup_cache()
+        except Exception as e:
+            MiraLog("tts", f"清理缓存时出错：{str(e)}", "ERROR")
+
+def _start_cleanup_timer():
+    """启动后台定时清理线程（只启动一次）"""
+    global _cleanup_thread
+    with _cache_lock:
+        if _cleanup_thread is not None:
             return
+        _cleanup_thread = threading.Thread(target=_cleanup_loop, name="tts-cache-cleanup", daemon=True)
+        _cleanup_thread.start()
+
+def _effective_voice(model: str, voice: str) -> str:
+    """实际用于合成的音色（cosyvoice 不支持的音色回退为 longwan）"""
+    if model == "cosyvoice-v1" and voice not in COSYVOICE_VOICES:
+        return "longwan"
+    return voice
 
-        current_time = time.time()
-        files_to_delete = []
-        total_size = 0
-        need_cleanup = False
+def _cache_key(cleaned_text: str, voice: str, model: str, audio_format: str) -> str:
+    """由清理后的文本、实际音色、模型与音频格式确定的缓存 key，相同内容总是得到相同文件名"""
+    payload = json.dumps([cleaned_text, voice, model, audio_format], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-        # 遍历所有文件
-        for filename in os.listdir(AUDIO_CACHE_DIR):
-            if not filename.endswith('.wav'):
+def _load_cache_index(save_dir: str):
+    """首次使用时扫描一次缓存目录建立索引（调用方持有 _cache_lock），按文件修改时间近似最近访问顺序"""
+    global _cache_bytes, _cache_loaded
+    if _cache_loaded:
+        return
+    entries = []
+    if os.path.exists(save_dir):
+        for filename in os.listdir(save_dir):
+            key, ext = os.path.splitext(filename)
+            if ext.lstrip(".") not in AUDIO_FORMATS.values():
                 continue
-                
-            file_path = os.path.join(AUDIO_CACHE_DIR, filename)
-            file_stat = os.stat(file_path)
-            file_age = current_time - file_stat.st_mtime
-            file_size = file_stat.st_size / (1024 * 1024)  # MB
-            
-            # 检查文件是否过期
-            if file_age > MAX_CACHE_AGE_HOURS * 3600:
-                files_to_delete.append(file_path)
-                need_cleanup = True
-            else:
-                total_size += file_size
-
-        # 检查是否需要基于大小清理
-        MiraLog("tts", f"当前缓存大小：{total_size}MB")
-        MiraLog("tts", f"最大缓存大小：{MAX_CACHE_SIZE_MB}MB")
-        if total_size > MAX_CACHE_SIZE_MB:
-            need_cleanup = True
-            # 按修改时间排序所有文件
-            all_files = [(os.path.join(AUDIO_CACHE_DIR, f), os.path.getmtime(os.path.join(AUDIO_CACHE_DIR, f)))
-                        for f in os.listdir(AUDIO_CACHE_DIR) if f.endswith('.wav')]
-            all_files.sort(key=lambda x: x[1])  # 按修改时间排序
-            
-            # 删除最旧的文件直到总大小低于限制
-            for file_path, _ in all_files:
-                if total_size <= MAX_CACHE_SIZE_MB:
-                    break
-                if file_path not in files_to_delete:  # 避免重复添加
-                    file_size = os.path.getsize(file_path) / (1024 * 1024)
-                    files_to_delete.append(file_path)
-                    total_size -= file_size
-
-        # 只有在需要清理时才执行删除操作
-        if need_cleanup:
-            MiraLog("tts", f"需要清理的文件数量：{len(files_to_delete)}")
-            for file_path in files_to_delete:
-                try:
-                    os.remove(file_path)
-                    MiraLog("tts", f"已删除缓存文件：{file_path}")
-                except Exception as e:
-                    MiraLog("tts", f"删除文件失败 {file_path}: {str(e)}")
-        else:
-            MiraLog("tts", "无需清理缓存")
+            file_path = os.path.join(save_dir, filename)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append(CacheEntry(file_path, stat.st_size, stat.st_mtime))
+    entries.sort(key=lambda entry: entry.last_access)
+    for entry in entries:
+        _cache_index[os.path.splitext(os.path.basename(entry.path))[0]] = entry
+        _cache_bytes += entry.size
+    _cache_loaded = True
 
-    except Exception as e:
-        MiraLog("tts", f"清理缓存时出错：{str(e)}")
+def _cache_lookup(key: str):
+    """查询缓存，命中时刷新 LRU 顺序与最近访问时间并返回文件路径"""
+    global _cache_bytes
+    with _cache_lock:
+        entry = _cache_index.get(key)
+        if entry is None:
+            _cache_stats["misses"] += 1
+            return None
+        if not os.path.exists(entry.path):
+            # 文件已被外部删除
+            del _cache_index[key]
+            _cache_bytes -= entry.size
+            _cache_stats["misses"] += 1
+            return None
+        entry.last_access = time.time()
+        _cache_index.move_to_end(key)
+        _cache_stats["hits"] += 1
+        return entry.path
 
-def _ensure_cache_cleanup():
-    """确保缓存清理机制运行"""
-    cleanup_file = os.path.join(AUDIO_CACHE_DIR, ".last_cleanup")
-    current_time = time.time()
-    
-    try:
-        # 检查当前缓存大小
-        current_size = _get_cache_size_mb()
-        MiraLog("tts", f"检查缓存状态 - 当前大小：{current_size}MB，最大限制：{MAX_CACHE_SIZE_MB}MB")
-        
-        # 检查是否需要基于时间间隔清理
-        time_based_cleanup = False
-        if os.path.exists(cleanup_file):
-            last_cleanup = os.path.getmtime(cleanup_file)
-            time_based_cleanup = current_time - last_cleanup >= CLEANUP_INTERVAL_HOURS * 3600
-            if time_based_cleanup:
-                MiraLog("tts", f"达到清理时间间隔：{CLEANUP_INTERVAL_HOURS}小时")
-        else:
-            time_based_cleanup = True
-            MiraLog("tts", "清理记录文件不存在，需要清理")
-        
-        # 检查是否需要基于大小清理
-        size_based_cleanup = current_size > MAX_CACHE_SIZE_MB
-        if size_based_cleanup:
-            MiraLog("tts", "缓存大小超过限制，需要清理")
-        
-        # 如果任一条件满足，执行清理
-        if time_based_cleanup or size_based_cleanup:
-            _cleanup_cache()
-            # 更新最后清理时间
-            with open(cleanup_file, 'w') as f:
-                f.write(str(current_time))
-        else:
-            MiraLog("tts", "无需清理缓存")
-            
-    except Exception as e:
-        MiraLog("tts", f"检查缓存状态时出错：{str(e)}")
+def _cache_insert(key: str, file_path: str):
+    """登记新合成的音频，并按 LRU 淘汰直到总大小低于上限"""
+    global _cache_bytes
+    size = os.path.getsize(file_path)
+    evicted = []
+    with _cache_lock:
+        old = _cache_index.pop(key, None)
+        if old:
+            _cache_bytes -= old.size
+        _cache_index[key] = CacheEntry(file_path, size, time.time())
+        _cache_bytes += size
+        while _cache_bytes > MAX_CACHE_SIZE_MB * 1024 * 1024 and len(_cache_index) > 1:
+            _, entry = _cache_index.popitem(last=False)
+            _cache_bytes -= entry.size
+            _cache_stats["evictions"] += 1
+            evicted.append(entry.path)
+    _remove_files(evicted)
+
+def get_tts_cache_stats() -> dict:
+    """返回音频缓存的命中/未命中次数、淘汰次数、条目数与总大小"""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats["entries"] = len(_cache_index)
+        stats["size_mb"] = _cache_bytes / (1024 * 1024)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
 
 def _clean_text_for_tts(text: str) -> str:
     """
@@ -156,6 +223,195 @@ def _clean_text_for_tts(text: str) -> str:
     
     return text.strip()
 
+class _PooledSynthesizer:
+    """连接池中的一个 CosyVoice 合成器及其最近使用时间"""
+    __slots__ = ("synthesizer", "last_used", "uses")
+
+    def __init__(self, synthesizer):
+        self.synthesizer = synthesizer
+        self.last_used = time.time()
+        self.uses = 0
+
+class CosyVoicePool:
+    """
+    按 (api_key, 音色) 划分的 CosyVoice 合成器连接池：
+    - 复用 WebSocket 连接，省去每次合成的建连与握手
+    - 并发数有上限，超出时等待空闲连接
+    - 取出时做健康检查：连接已断开或空闲过久的合成器丢弃重建；合成失败的合成器不放回
+    """
+
+    def __init__(self, api_key: str, voice: str, model: str = "cosyvoice-v1", size: int = COSYVOICE_POOL_SIZE):
+        self.api_key = api_key
+        self.voice = voice
+        self.model = model
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "discarded": 0, "failed": 0}
+
+    def _with_api_key(self, fn):
+        """在锁内临时设置全局 api_key 执行 fn，避免并发会话互相覆盖 key"""
+        with _dashscope_key_lock:
+            previous = dashscope.api_key
+            dashscope.api_key = self.api_key
+            try:
+                return fn()
+            finally:
+                dashscope.api_key = previous
+
+    def _create(self) -> _PooledSynthesizer:
+        synthesizer = self._with_api_key(lambda: SpeechSynthesizer(model=self.model, voice=self.voice))
+        self.stats["created"] += 1
+        return _PooledSynthesizer(synthesizer)
+
+    def _prepare_for_reuse(self, pooled: _PooledSynthesizer) -> bool:
+        """
+        重置合成器状态并保持连接（依赖 SDK 的内部接口，与 SDK 自带的对象池做法一致）。
+        :return: 当前 SDK 版本不支持复用时返回 False
+        """
+        synthesizer = pooled.synthesizer
+        try:
+            synthesizer._SpeechSynthesizer__reset()
+            self._with_api_key(lambda: synthesizer._SpeechSynthesizer__update_params(
+                model=self.model, voice=self.voice, close_ws_after_use=False,
+            ))
+            return True
+        except (AttributeError, TypeError):
+            return False
+
+    def _is_healthy(self, pooled: _PooledSynthesizer) -> bool:
+        if time.time() - pooled.last_used > COSYVOICE_KEEPALIVE_S:
+            return False
+        is_connected = getattr(pooled.synthesizer, "_SpeechSynthesizer__is_connected", None)
+        return bool(is_connected and is_connected())
+
+    def _discard(self, pooled: _PooledSynthesizer):
+        self.stats["discarded"] += 1
+        try:
+            pooled.synthesizer.close()
+        except Exception:
+            pass
+
+    def _acquire(self) -> _PooledSynthesizer:
+        if not self._slots.acquire(timeout=COSYVOICE_ACQUIRE_TIMEOUT_S):
+            raise TimeoutError(f"等待 CosyVoice 合成连接超时（音色 {self.voice}）")
+        try:
+            while True:
+                with self._lock:
+                    pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    pooled = self._create()
+                    break
+                if self._is_healthy(pooled):
+                    self.stats["reused"] += 1
+                    break
+                self._discard(pooled)
+            if not self._prepare_for_reuse(pooled):
+                # 不支持复用的 SDK 版本：每次使用新的合成器
+                pooled = self._create()
+            return pooled
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, pooled: _PooledSynthesizer, healthy: bool):
+        if healthy:
+            pooled.last_used = time.time()
+            pooled.uses += 1
+            with self._lock:
+                self._idle.append(pooled)
+        else:
+            self._discard(pooled)
+        self._slots.release()
+
+    def call(self, text: str) -> bytes:
+        """从连接池取出合成器合成整段文本，返回音频字节"""
+        pooled = self._acquire()
+        try:
+            audio = pooled.synthesizer.call(text)
+            if not audio:
+                raise RuntimeError("CosyVoice 未返回音频数据")
+        except BaseException:
+            self.stats["failed"] += 1
+            self._release(pooled, healthy=False)
+            raise
+        MiraLog("tts", f"requestId: {pooled.synthesizer.get_last_request_id()}，连接复用次数：{pooled.uses}")
+        self._release(pooled, healthy=True)
+        return audio
+
+    def close(self):
+        """关闭全部空闲连接"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for pooled in idle:
+            self._discard(pooled)
+
+def get_cosyvoice_pool(api_key: str, voice: str, model: str = "cosyvoice-v1") -> CosyVoicePool:
+    """获取 (api_key, 音色, 模型) 对应的连接池，不存在时创建"""
+    key = (api_key, voice, model)
+    with _cosyvoice_pools_lock:
+        pool = _cosyvoice_pools.get(key)
+        if pool is None:
+            pool = CosyVoicePool(api_key, voice, model)
+            _cosyvoice_pools[key] = pool
+        return pool
+
+def get_cosyvoice_pool_stats() -> dict:
+    """返回各连接池（按音色区分，不含 api_key）的创建、复用、丢弃与失败次数"""
+    with _cosyvoice_pools_lock:
+        pools = list(_cosyvoice_pools.values())
+    stats = {}
+    for pool in pools:
+        merged = stats.setdefault(f"{pool.model}/{pool.voice}", {name: 0 for name in pool.stats})
+        for name, value in pool.stats.items():
+            merged[name] += value
+        merged["idle"] = merged.get("idle", 0) + len(pool._idle)
+    return stats
+
+def _synthesize(cleaned_text: str, voice: str, model: str, api_key: str, save_path: str):
+    """调用 DashScope 合成音频并写入 save_path（先写临时文件再替换，避免读到写了一半的文件）"""
+    tmp_path = f"{save_path}.{threading.get_ident()}.tmp"
+    if model == "qwen-tts":
+        # 调用 TTS API
+        response = dashscope.audio.qwen_tts.SpeechSynthesizer.call(
+            model="qwen-tts",
+            api_key=api_key,
+            text=cleaned_text,
+            voice=voice,
+        )
+        
+        if not response or not response.output or not response.output.audio:
+            raise RuntimeError("TTS API 返回结果异常")
+            
+        audio_url = response.output.audio["url"]
+        
+        # 下载音频文件
+        response = requests.get(audio_url)
+        response.raise_for_status()
+        audio = response.content
+        
+    elif model == "cosyvoice-v1":
+        audio = get_cosyvoice_pool(api_key, voice, model).call(cleaned_text)
+    
+    with open(tmp_path, 'wb') as f:
+        f.write(audio)
+    os.replace(tmp_path, save_path)
+
+def audio_filename(text: str, voice: str = "longwan", model: str = "cosyvoice-v1"):
+    """
+    文本对应的内容寻址音频文件名，与 text_to_speech 的缓存文件名一致。
+    :return: 文件名；清理后的文本为空时返回 None
+    """
+    cleaned_text = _clean_text_for_tts(text)
+    if not cleaned_text:
+        return None
+    audio_format = AUDIO_FORMATS[model]
+    return f"{_cache_key(cleaned_text, _effective_voice(model, voice), model, audio_format)}.{audio_format}"
+
+def synthesize_to_file(text: str, save_path: str, voice: str = "longwan", api_key: str = None, model: str = "cosyvoice-v1"):
+    """不经过缓存索引，直接合成音频写入 save_path（用于离线生成只读的音频资源）"""
+    _synthesize(_clean_text_for_tts(text), _effective_voice(model, voice), model, api_key, save_path)
+
 def text_to_speech(text: str, voice: str = "longwan", save_dir: str = AUDIO_CACHE_DIR, api_key: str = None, model: str = "cosyvoice-v1") -> str:
     """
     将文本转换为语音并保存为音频文件
@@ -179,50 +435,28 @@ def text_to_speech(text: str, voice: str = "longwan", save_dir: str = AUDIO_CACH
         # 确保缓存目录存在
         Path(save_dir).mkdir(parents=True, exist_ok=True)
         
-        # 检查并清理缓存
-        _ensure_cache_cleanup()
-        
-        # 生成唯一的文件名
-        import hashlib
-        if model == "qwen-tts":
-            filename = f"{hashlib.md5(f'{text}_{time.time()}'.encode()).hexdigest()}.wav"
-        elif model == "cosyvoice-v1":
-            filename = f"{hashlib.md5(f'{text}_{time.time()}'.encode()).hexdigest()}.mp3"
-        save_path = os.path.join(save_dir, filename)
-        
-        if model == "qwen-tts":
-            # 调用 TTS API
-            response = dashscope.audio.qwen_tts.SpeechSynthesizer.call(
-                model="qwen-tts",
-                api_key=api_key,
-                text=cleaned_text,
-                voice=voice,
-            )
-            
-            if not response or not response.output or not response.output.audio:
-                MiraLog("tts", "TTS API 返回结果异常", "ERROR")
-                return None
-                
-            audio_url = response.output.audio["url"]
-            
-            # 下载音频文件
-            response = requests.get(audio_url)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
-            
-        elif model == "cosyvoice-v1":
-            dashscope.api_key = api_key
-            model = "cosyvoice-v1"
-            if voice not in ["longwan", "longcheng", "longhua", "longxiaochun", "longxiaochun"]:
-                voice = "longwan"
-            synthesizer = SpeechSynthesizer(model=model, voice=voice)
-            audio = synthesizer.call(text)
-            print('requestId: ', synthesizer.get_last_request_id())
-            with open(save_path, 'wb') as f:
-                f.write(audio)
-            
+        # 相同文本、音色、模型、格式的音频直接复用缓存
+        voice = _effective_voice(model, voice)
+        audio_format = AUDIO_FORMATS[model]
+        key = _cache_key(cleaned_text, voice, model, audio_format)
+        with _cache_lock:
+            _load_cache_index(save_dir)
+            inflight = _inflight_locks.setdefault(key, threading.Lock())
+        try:
+            with inflight:
+                cached_path = _cache_lookup(key)
+                if cached_path:
+                    MiraLog("tts", f"命中音频缓存：{cached_path}")
+                    return cached_path
+                save_path = os.path.join(save_dir, f"{key}.{audio_format}")
+                _synthesize(cleaned_text, voice, model, api_key, save_path)
+                _cache_insert(key, save_path)
+        finally:
+            # 命中缓存、合成成功或失败都要移除去重锁，避免每个 key 残留一个条目
+            with _cache_lock:
+                if _inflight_locks.get(key) is inflight and not inflight.locked():
+                    del _inflight_locks[key]
+
         MiraLog("tts", f"音频文件已保存至：{save_path}")
         return save_path
         
@@ -230,13 +464,108 @@ def text_to_speech(text: str, voice: str = "longwan", save_dir: str = AUDIO_CACH
         MiraLog("tts", f"TTS 转换失败：{str(e)}", "ERROR")
         return None
 
+class SentenceStreamer:
+    """
+    流式 TTS：把逐步增长的回复文本切分成句子，每凑齐一句就提交后台合成，
+    后续文本仍在生成时前面的句子已经在合成，按句子顺序产出音频片段。
+    """
+
+    def __init__(self, voice: str = "longwan", api_key: str = None, model: str = "cosyvoice-v1", save_dir: str = AUDIO_CACHE_DIR):
+        self.voice = voice
+        self.api_key = api_key
+        self.model = model
+        self.save_dir = save_dir
+        self._text = ""
+        self._consumed = 0
+        self._pending = deque()
+
+    def _submit(self, sentence: str):
+        if _clean_text_for_tts(sentence):
+            self._pending.append(_tts_executor.submit(text_to_speech, sentence, self.voice, self.save_dir, self.api_key, self.model))
+
+    def feed(self, text: str):
+        """
+        输入当前累计的完整回复文本，切出新完成的句子并提交合成。
+        :param text: 截至目前的全部回复文本（与流式节点的 content_buffer 一致）
+        """
+        if not text.startswith(self._text):
+            # 文本被重新生成，从头开始切分
+            self._consumed = 0
+        self._text = text
+        start = self._consumed
+        for match in _SENTENCE_END.finditer(text, self._consumed):
+            if len(text[start:match.end()].strip()) < MIN_SENTENCE_CHARS:
+                continue
+            self._submit(text[start:match.end()])
+            start = match.end()
+        self._consumed = start
+
+    def finish(self, text: str = None):
+        """回复生成结束：合成剩余不足一句的尾部文本，并重置切分状态以便处理下一条回复"""
+        if text is not None:
+            self.feed(text)
+        tail = self._text[self._consumed:]
+        if tail.strip():
+            self._submit(tail)
+        self._text = ""
+        self._consumed = 0
+
+    def ready_chunks(self) -> list:
+        """非阻塞地取出已按顺序合成完成的音频片段路径"""
+        chunks = []
+        while self._pending and self._pending[0].done():
+            path = self._pending.popleft().result()
+            if path:
+                chunks.append(path)
+        return chunks
+
+    def drain(self, timeout: float = None, deadline_s: float = None):
+        """
+        按顺序等待并逐个产出剩余的音频片段；单句超时的片段跳过。
+        :param deadline_s: 全部片段的等待上限，超过后取消剩余合成
+        """
+        deadline = time.time() + deadline_s if deadline_s else None
+        while self._pending:
+            wait = timeout
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    MiraLog("tts", f"音频等待超过 {deadline_s}s，取消剩余合成", "WARNING")
+                    self.cancel()
+                    return
+                wait = min(wait, remaining) if wait else remaining
+            future = self._pending.popleft()
+            try:
+                path = future.result(timeout=wait)
+            except Exception as e:
+                MiraLog("tts", f"分句合成失败或超时：{e}", "WARNING")
+                future.cancel()
+                continue
+            if path:
+                yield path
+
+    def cancel(self):
+        """取消尚未开始的合成任务（已在进行中的合成完成后写入缓存，结果不再推送）"""
+        cancelled = 0
+        while self._pending:
+            cancelled += int(self._pending.popleft().cancel())
+        if cancelled:
+            MiraLog("tts", f"已取消 {cancelled} 个未开始的合成任务")
+
+def text_to_speech_async(text: str, voice: str = "longwan", save_dir: str = AUDIO_CACHE_DIR, api_key: str = None, model: str = "cosyvoice-v1"):
+    """把 text_to_speech 提交到后台线程池，立即返回 Future，调用方可先展示文本再等待音频"""
+    return _tts_executor.submit(text_to_speech, text, voice, save_dir, api_key, model)
+
 def init_audio_cache():
-    """初始化音频缓存目录"""
+    """初始化音频缓存目录：建立缓存索引、清理旧缓存并启动后台定时清理"""
     try:
         # 创建缓存目录
         Path(AUDIO_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+        with _cache_lock:
+            _load_cache_index(AUDIO_CACHE_DIR)
         # 清理旧缓存
         _cleanup_cache()
+        _start_cleanup_timer()
     except Exception as e:
         print(f"初始化音频缓存失败：{str(e)}")
 
@@ -0,0 +1,66 @@
+"""
+基于短时能量的语音活动检测（VAD）：对整段 PCM 向量化计算帧能量，去掉首尾及中间的长静音，
+并把过长的语音段在能量最低处切开，便于分段并行识别。
+"""
+from typing import List, Tuple
+
+from config import ASR
+
+
+def detect_speech_segments(pcm: bytes, sample_rate: int, **overrides) -> List[Tuple[int, int]]:
+    """
+    检测语音段。
+    :param pcm: 单声道 16bit PCM
+    :return: [(起始采样点, 结束采样点), ...]，按时间排序；没有语音时返回空列表
+    """
+    import numpy as np
+
+    options = {**ASR["vad"], **overrides}
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frame_len = int(sample_rate * options["frame_ms"] / 1000)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return []
+
+    # 帧能量（dB），整段一次性计算
+    frames = samples[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len)
+    energy_db = 10 * np.log10((frames ** 2).mean(axis=1) + 1e-6)
+
+    # 自适应阈值：以低分位能量估计底噪，高于底噪 margin_db 且高于绝对下限的帧视为语音
+    noise_floor = np.percentile(energy_db, options["noise_percentile"])
+    threshold = max(noise_floor + options["margin_db"], options["min_energy_db"])
+    speech = energy_db > threshold
+
+    # 两端各延长 hangover 帧，避免切掉字头字尾
+    hangover = int(options["hangover_ms"] / options["frame_ms"])
+    if hangover:
+        kernel = np.ones(2 * hangover + 1, dtype=np.int32)
+        speech = np.convolve(speech.astype(np.int32), kernel, mode="full")[hangover:hangover + n_frames] > 0
+
+    # 语音段边界
+    padded = np.concatenate([[False], speech, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    segments = list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+    # 合并间隔过短的相邻段，丢弃过短的段
+    min_gap = int(options["min_silence_ms"] / options["frame_ms"])
+    min_len = int(options["min_speech_ms"] / options["frame_ms"])
+    merged = []
+    for start, end in segments:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    merged = [(s, e) for s, e in merged if e - s >= min_len]
+
+    # 过长的段在后半部分能量最低的帧处切开
+    max_len = int(options["max_segment_s"] * 1000 / options["frame_ms"])
+    result = []
+    for start, end in merged:
+        while end - start > max_len:
+            search_from = start + max_len // 2
+            cut = search_from + int(np.argmin(energy_db[search_from:start + max_len]))
+            result.append((start, cut))
+            start = cut
+        result.append((start, end))
+    return [(s * frame_len, e * frame_len) for s, e in result]
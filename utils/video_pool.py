@@ -0,0 +1,180 @@
+"""
+视频/人脸处理专用进程池：视频解码、音频提取、ONNX 推理等 CPU 密集任务放到常驻子进程中执行，
+避免占满 Gradio 工作线程，影响纯文字对话。每个子进程启动时预加载人脸模型。
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import VIDEO_POOL
+from utils.loggers import MiraLog
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending_slots = threading.BoundedSemaphore(VIDEO_POOL["max_pending"])
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,        # 等待在途名额超时而未提交的任务数
+    "pool_restarts": 0,   # 子进程异常退出导致进程池损坏后重建的次数
+    "in_flight": 0,
+    "total_wait_s": 0.0,  # 任务在队列中等待的累计时间
+    "total_run_s": 0.0,   # 任务在子进程中执行的累计时间
+}
+
+
+def _init_worker():
+    """子进程初始化：关闭日志清空并预加载人脸模型"""
+    import config
+
+    # 日志文件已由主进程清空，子进程只追加
+    for logger_config in config.LOGGERS.values():
+        logger_config["clear_log"] = False
+
+    from utils.face_engine import get_face_engine
+    try:
+        get_face_engine()
+    except Exception as e:
+        MiraLog("app", f"[video_pool] 子进程预加载人脸模型失败: {e}", "ERROR")
+
+
+def _run_job(fn, args, kwargs):
+    """在子进程中执行任务，并带回开始/结束时间用于统计"""
+    started_at = time.time()
+    result = fn(*args, **kwargs)
+    return result, started_at, time.time()
+
+
+def _warm_job():
+    """空任务，用于在启动时拉起全部子进程"""
+    return None
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn：子进程不继承父进程的线程与 ONNX 会话，避免 fork 导致的死锁
+            _pool = ProcessPoolExecutor(
+                max_workers=VIDEO_POOL["max_workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            MiraLog("app", f"[video_pool] 视频处理进程池已创建，worker 数: {VIDEO_POOL['max_workers']}")
+        return _pool
+
+
+def _reset_broken_pool(pool):
+    """子进程异常退出（如 OOM、段错误）后进程池不可再用：丢弃它，下次提交时重建"""
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            # 已被其他线程重置
+            return
+        _pool = None
+    with _metrics_lock:
+        _metrics["pool_restarts"] += 1
+    MiraLog("app", "[video_pool] 子进程异常退出，进程池已损坏，将在下次提交时重建", "ERROR")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def start_video_pool():
+    """启动进程池并拉起全部 worker（各自预加载人脸模型），进程池未启用时不做任何事"""
+    if not VIDEO_POOL["enabled"]:
+        return
+    pool = _get_pool()
+    for _ in range(VIDEO_POOL["max_workers"]):
+        pool.submit(_run_job, _warm_job, (), {})
+
+
+def _on_done(pool, submitted_at, future: Future, outer: Future):
+    _pending_slots.release()
+    try:
+        result, started_at, finished_at = future.result()
+    except BaseException as e:
+        if isinstance(e, BrokenProcessPool):
+            _reset_broken_pool(pool)
+        with _metrics_lock:
+            _metrics["in_flight"] -= 1
+            _metrics["failed"] += 1
+        outer.set_exception(e)
+        return
+    with _metrics_lock:
+        _metrics["in_flight"] -= 1
+        _metrics["completed"] += 1
+        _metrics["total_wait_s"] += max(started_at - submitted_at, 0.0)
+        _metrics["total_run_s"] += finished_at - started_at
+    outer.set_result(result)
+
+
+def submit(fn, *args, **kwargs) -> Future:
+    """
+    提交任务到视频处理进程池。在途任务数达到 max_pending 时阻塞等待（最多 submit_timeout_s 秒），避免无限排队。
+    进程池因子进程异常退出而损坏时自动重建。进程池未启用时在当前线程同步执行。
+    :param fn: 可被 pickle 的模块级函数
+    :return: concurrent.futures.Future
+    """
+    if not VIDEO_POOL["enabled"]:
+        outer = Future()
+        try:
+            outer.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            outer.set_exception(e)
+        return outer
+
+    if not _pending_slots.acquire(timeout=VIDEO_POOL["submit_timeout_s"]):
+        with _metrics_lock:
+            _metrics["rejected"] += 1
+        raise TimeoutError(f"视频处理进程池繁忙，等待 {VIDEO_POOL['submit_timeout_s']}s 仍无空闲名额")
+    with _metrics_lock:
+        _metrics["submitted"] += 1
+        _metrics["in_flight"] += 1
+    submitted_at = time.time()
+    outer = Future()
+    try:
+        pool = _get_pool()
+        try:
+            future = pool.submit(_run_job, fn, args, kwargs)
+        except BrokenProcessPool:
+            # 进程池在上次任务结束后才损坏，重建后重试一次
+            _reset_broken_pool(pool)
+            pool = _get_pool()
+            future = pool.submit(_run_job, fn, args, kwargs)
+    except BaseException:
+        _pending_slots.release()
+        with _metrics_lock:
+            _metrics["in_flight"] -= 1
+            _metrics["failed"] += 1
+        raise
+    future.add_done_callback(lambda f: _on_done(pool, submitted_at, f, outer))
+    return outer
+
+
+async def asubmit(fn, *args, **kwargs):
+    """submit 的异步版本，可在 async 节点/处理函数中 await 结果"""
+    future = await asyncio.to_thread(submit, fn, *args, **kwargs)
+    return await asyncio.wrap_future(future)
+
+
+def run_in_video_pool(fn, *args, timeout=None, **kwargs):
+    """同步提交并等待结果，等待期间当前线程不占用 CPU"""
+    return submit(fn, *args, **kwargs).result(timeout=timeout)
+
+
+def get_video_pool_metrics() -> dict:
+    """返回进程池的队列深度与耗时指标"""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    finished = metrics["completed"] + metrics["failed"]
+    metrics["enabled"] = VIDEO_POOL["enabled"]
+    metrics["max_workers"] = VIDEO_POOL["max_workers"]
+    metrics["queue_depth"] = max(metrics["in_flight"] - VIDEO_POOL["max_workers"], 0)
+    metrics["avg_wait_s"] = metrics["total_wait_s"] / finished if finished else 0.0
+    metrics["avg_run_s"] = metrics["total_run_s"] / finished if finished else 0.0
+    return metrics